@@ -13,17 +13,12 @@ except ImportError:
     from PIL import Image, ImageDraw, ImageFont
 
 def create_icon(size, filename):
-    """Create a simple gradient icon with a magnifying glass symbol"""
+    """Create a simple icon with a magnifying glass symbol"""
     
-    # Create image with gradient background
+    # Create image with solid background
     img = Image.new('RGB', (size, size), color='#667eea')
     draw = ImageDraw.Draw(img)
     
-    # Draw gradient effect with circles
-    for i in range(10):
-        opacity = int(255 * (1 - i / 10))
-        color = f'#{hex(102 + i * 8)[2:].zfill(2)}{hex(126 + i * 8)[2:].zfill(2)}{hex(234)[2:]}'
-        
     # Draw a simple magnifying glass
     center_x, center_y = size // 2, size // 2
     glass_radius = int(size * 0.25)
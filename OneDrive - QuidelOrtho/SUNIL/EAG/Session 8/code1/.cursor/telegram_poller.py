@@ -1,8 +1,18 @@
-import os, time, requests, traceback, asyncio
+import os, re, json, random, secrets, asyncio
 import sys
+import logging
+import aiohttp
 from pathlib import Path
 from dotenv import load_dotenv
 
+try:
+    import orjson  # Optional; decodes large getUpdates batches several times faster
+    _json_loads = orjson.loads
+    _json_dumps = lambda obj: orjson.dumps(obj).decode()
+except ImportError:  # pragma: no cover
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
 # Fix Windows console encoding for Unicode (emojis, etc.)
 if sys.platform == "win32":
     try:
@@ -17,52 +27,98 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 # Load environment variables from .env file
 load_dotenv()
 
+# Configure logging before importing the agent (its SSE client calls basicConfig too)
+logging.basicConfig(
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(message)s",
+    stream=sys.stdout
+)
+logger = logging.getLogger("telegram_poller")
+
 from agent.orchestrator import CursorAgent  # your class
 
 BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
 CHAT_ID   = os.environ.get("TELEGRAM_CHAT_ID")  # optional filter
 API = f"https://api.telegram.org/bot{BOT_TOKEN}"
 
+# Long-poll settings: hold getUpdates open close to Telegram's maximum and
+# only ask for the update types we actually handle
+POLL_TIMEOUT = 50
+ALLOWED_UPDATES = json.dumps(["message", "edited_message"])
+
+# F1 workflow trigger: message mentions both "standing" and "sheet" (any order/case);
+# anchored so a miss costs one scan instead of one per start offset
+_F1_TRIGGER = re.compile(r"\A(?=.*standing)(?=.*sheet)", re.IGNORECASE | re.DOTALL)
+
+# "longpoll" (default) pulls updates with getUpdates; "webhook" has Telegram push them
+TELEGRAM_MODE = os.environ.get("TELEGRAM_MODE", "longpoll").strip().lower()
+
+# Workflow settings are read once; changing them requires a restart
+_SELF_EMAIL = os.environ.get("SELF_EMAIL", "").strip()
+_F1_URL = os.environ.get("F1_STANDINGS_URL", "https://www.formula1.com/en/results/2025/drivers")
+_F1_WORKFLOW_GOAL = f"""Extract the 2025 F1 Driver Standings table from {_F1_URL} using web scraping.
+Parse the table with columns: Position, Driver, Nationality, Team, and Points.
+Create a Google Sheet with this data, share it with me, and send me the link via Gmail."""
+_SELF_EMAIL_MISSING_MSG = ("❌ Cannot run F1 workflow: SELF_EMAIL is not configured!\n\n"
+                           "Please add your email to the .env file:\n"
+                           "SELF_EMAIL=your_email@example.com\n\n"
+                           "Then restart the bot.")
+
 # Reuse one agent instance
 agent = CursorAgent()
 
-async def handle(text: str) -> str:
+# Shared aiohttp session (created lazily inside the running event loop)
+_session = None
+
+# Keep references to in-flight message tasks so they aren't garbage-collected
+_tasks = set()
+
+# Admission control: at most this many F1 workflows run at once, the rest wait their turn
+_WORKFLOW_SEM = asyncio.Semaphore(int(os.environ.get("MAX_CONCURRENT_WORKFLOWS", "2")))
+
+# Longest rate-limit wait honoured before retrying a send
+_MAX_RETRY_AFTER_S = 60.0
+
+# Upper bound on one F1 workflow so a hung tool call can't hold a slot forever
+WORKFLOW_TIMEOUT_S = float(os.environ.get("WORKFLOW_TIMEOUT_S", "180"))
+
+async def handle(text: str, notify=None) -> str:
     # Simple intent gate: if message contains "standing" & "sheet", run your workflow
-    print(f"[DEBUG] Received message: {text}")
-    t = text.lower()
+    logger.debug("Received message: %s", text)
     
-    if "standing" in t and "sheet" in t:
-        print("[DEBUG] Detected F1 workflow trigger!")
+    if _F1_TRIGGER.match(text):
+        logger.debug("Detected F1 workflow trigger")
         
         # Check if SELF_EMAIL is configured
-        self_email = os.environ.get('SELF_EMAIL', '').strip()
-        if not self_email:
-            error_msg = ("❌ Cannot run F1 workflow: SELF_EMAIL is not configured!\n\n"
-                        "Please add your email to the .env file:\n"
-                        "SELF_EMAIL=your_email@example.com\n\n"
-                        "Then restart the bot.")
-            print(f"[ERROR] {error_msg}")
-            return error_msg
+        if not _SELF_EMAIL:
+            logger.error("%s", _SELF_EMAIL_MISSING_MSG)
+            return _SELF_EMAIL_MISSING_MSG
         
-        print("[DEBUG] Starting workflow execution...")
+        logger.debug("Starting workflow execution")
         
         try:
-            # Get F1 URL from environment or use default
-            f1_url = os.environ.get('F1_STANDINGS_URL', 'https://www.formula1.com/en/results/2025/drivers')
-            
-            workflow_goal = f"""Extract the 2025 F1 Driver Standings table from {f1_url} using web scraping.
-Parse the table with columns: Position, Driver, Nationality, Team, and Points.
-Create a Google Sheet with this data, share it with me, and send me the link via Gmail."""
+            workflow_goal = _F1_WORKFLOW_GOAL
+            logger.debug("Workflow goal: %.100s...", workflow_goal)
             
-            print(f"[DEBUG] Workflow goal: {workflow_goal[:100]}...")
+            if _WORKFLOW_SEM.locked() and notify:
+                await notify("⏳ Queued, processing soon")
             
-            res = await agent.execute_workflow(workflow_goal)
+            async with _WORKFLOW_SEM:
+                try:
+                    res = await asyncio.wait_for(
+                        agent.execute_workflow(workflow_goal),
+                        timeout=WORKFLOW_TIMEOUT_S
+                    )
+                except asyncio.TimeoutError:
+                    logger.error("Workflow timed out after %.0fs", WORKFLOW_TIMEOUT_S)
+                    return f"⌛ Workflow timed out after {WORKFLOW_TIMEOUT_S:.0f}s. Please retry."
             
-            print(f"[DEBUG] Workflow result: success={res.get('success')}")
+            logger.debug("Workflow result: success=%s", res.get("success"))
             
             if res.get("success"):
                 bb = res.get("blackboard", {})
-                print(f"[DEBUG] Blackboard keys: {list(bb.keys())}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Blackboard keys: %s", list(bb))
                 link = bb.get("sheet_url") or bb.get("public_link", "(no link)")
                 return f"✅ Done. Sheet: {link}"
             else:
@@ -71,168 +127,265 @@ Create a Google Sheet with this data, share it with me, and send me the link via
                     plan = res["plan"]
                     failed = [s for s in plan.steps if s.status == "failed"][0]
                     error_msg = f"❌ Failed at: {failed.description}\nError: {failed.result.error if failed.result else 'No error details'}"
-                    print(f"[DEBUG] {error_msg}")
+                    logger.debug("%s", error_msg)
                     return error_msg
                 except Exception as e:
                     error_msg = f"❌ Workflow failed: {str(e)}"
-                    print(f"[DEBUG] {error_msg}")
+                    logger.debug("%s", error_msg)
                     return error_msg
         except Exception as e:
             error_msg = f"❌ Exception during workflow: {str(e)}"
-            print(f"[DEBUG] {error_msg}")
-            traceback.print_exc()
+            logger.exception("%s", error_msg)
             return error_msg
     
     # Fallback: route generic messages to your chat handler
-    print("[DEBUG] Using fallback chat handler")
+    logger.debug("Using fallback chat handler")
     reply = await agent.process_message(text, conversation_id="telegram")
     return reply[:4000]
 
-def send(chat_id: int, text: str, max_retries: int = 3):
+async def get_session() -> aiohttp.ClientSession:
+    """Get or create the shared HTTP session (reuses TCP/TLS to api.telegram.org)."""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=60),
+            json_serialize=_json_dumps
+        )
+    return _session
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with jitter (capped at 30s) so clients don't retry in lockstep."""
+    return min(30, (2 ** attempt) * (0.5 + random.random()))
+
+async def send_async(chat_id: int, text: str, max_retries: int = 3):
     """Send a message to Telegram with error handling and retries."""
+    session = await get_session()
     for attempt in range(max_retries):
         try:
-            response = requests.post(
+            async with session.post(
                 f"{API}/sendMessage", 
                 json={"chat_id": chat_id, "text": text},
-                timeout=10
-            )
-            response.raise_for_status()  # Raise exception for bad status codes
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                try:
+                    # Telegram returns a JSON body (with error_code) even on 4xx/5xx
+                    result = _json_loads(await response.read())
+                except ValueError:
+                    response.raise_for_status()  # Raise exception for bad status codes
+                    raise
             
-            result = response.json()
             if result.get("ok"):
-                print(f"[INFO] Message sent successfully to chat_id={chat_id}")
+                logger.info("Message sent successfully to chat_id=%s", chat_id)
                 return True
-            else:
-                error_desc = result.get("description", "Unknown error")
-                print(f"[ERROR] Telegram API returned ok=false: {error_desc}")
-                if "retry after" in error_desc.lower():
-                    # Rate limit - wait and retry
-                    time.sleep(2 ** attempt)
-                    continue
+            
+            error_code = result.get("error_code")
+            error_desc = result.get("description", "Unknown error")
+            logger.error("Telegram API returned ok=false (code %s): %s", error_code, error_desc)
+            
+            retry_after = (result.get("parameters") or {}).get("retry_after")
+            if retry_after is not None:
+                if attempt == max_retries - 1:
+                    break  # No retry left to wait for
+                # Rate limit - wait as long as Telegram asks, within reason
+                await asyncio.sleep(min(float(retry_after), _MAX_RETRY_AFTER_S))
+                continue
+            if error_code and 400 <= error_code < 500 and error_code != 429:
+                # Bad request, forbidden, etc. - retrying won't help
                 return False
-        except requests.exceptions.Timeout:
-            print(f"[ERROR] Timeout sending message (attempt {attempt + 1}/{max_retries})")
             if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
-        except requests.exceptions.RequestException as e:
-            print(f"[ERROR] Request failed (attempt {attempt + 1}/{max_retries}): {e}")
+                await asyncio.sleep(_backoff_delay(attempt))
+        except asyncio.TimeoutError:
+            logger.error("Timeout sending message (attempt %d/%d)", attempt + 1, max_retries)
             if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
+                await asyncio.sleep(_backoff_delay(attempt))
+        except aiohttp.ClientError as e:
+            logger.error("Request failed (attempt %d/%d): %s", attempt + 1, max_retries, e)
+            if attempt < max_retries - 1:
+                await asyncio.sleep(_backoff_delay(attempt))
         except Exception as e:
-            print(f"[ERROR] Unexpected error sending message: {e}")
-            traceback.print_exc()
+            logger.exception("Unexpected error sending message: %s", e)
             return False
     
-    print(f"[ERROR] Failed to send message after {max_retries} attempts")
+    logger.error("Failed to send message after %d attempts", max_retries)
     return False
 
-def main():
-    offset = 0
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    print("=" * 60)
-    print("🤖 Telegram Bot Poller Started")
-    print("=" * 60)
-    print(f"Bot Token: {BOT_TOKEN[:20]}..." if BOT_TOKEN else "Bot Token: NOT SET")
-    print(f"Chat ID Filter: {CHAT_ID if CHAT_ID else 'None (accepting all chats)'}")
+async def process_and_reply(chat_id: int, text: str):
+    """Run the agent on one message and send the reply back to the chat."""
+    try:
+        logger.info("Processing message...")
+        out = await handle(text, notify=lambda msg: send_async(chat_id, msg))
+        logger.info("Sending response to chat_id=%s", chat_id)
+        await send_async(chat_id, out)
+        logger.info("Response sent successfully")
+    except Exception as e:
+        error_msg = "⚠️ Agent error. Check server logs."
+        logger.exception("Exception in message handler: %s", e)
+        await send_async(chat_id, error_msg)
+
+async def handle_update(upd: dict):
+    """Filter a raw Telegram update and reply to it if it carries a text message."""
+    msg = upd.get("message") or upd.get("edited_message")
+    if not msg: 
+        return
+    
+    chat_id = msg["chat"]["id"]
+    username = msg.get("from", {}).get("username", "unknown")
+    
+    logger.info("Received message from chat_id=%s, username=@%s", chat_id, username)
+    
+    if CHAT_ID and str(chat_id) != str(CHAT_ID):
+        logger.warning(
+            "Ignoring message from unauthorized chat_id: %s (expected %s). "
+            "To accept messages from this chat, update TELEGRAM_CHAT_ID=%s in your .env file "
+            "or remove TELEGRAM_CHAT_ID from .env to accept all chats",
+            chat_id, CHAT_ID, chat_id
+        )
+        return
     
-    self_email = os.environ.get('SELF_EMAIL', '').strip()
-    if self_email:
-        print(f"Self Email: {self_email}")
-    else:
-        print("Self Email: ⚠️  NOT SET - F1 workflow will fail!")
-        print("             Add SELF_EMAIL=your_email@example.com to .env file")
+    text = msg.get("text") or ""
+    if not text: 
+        logger.info("Message has no text, skipping")
+        return
     
-    # Show SSE configuration
-    use_sse = os.environ.get('USE_SSE_MCP', 'true').lower() == 'true'
-    if use_sse:
-        print("MCP Mode: 🌐 SSE Servers (HTTP)")
-        print("          Make sure SSE servers are running: python start_sse_servers.py")
-    else:
-        print("MCP Mode: 📁 Direct stdio calls")
+    await process_and_reply(chat_id, text)
+
+async def run_webhook_mode(session: aiohttp.ClientSession):
+    """Receive updates pushed by Telegram instead of long-polling for them."""
+    from webhook_server import run_webhook
+    
+    public_url = os.environ.get("TELEGRAM_WEBHOOK_URL", "").strip()
+    if not public_url:
+        logger.critical("TELEGRAM_MODE=webhook requires TELEGRAM_WEBHOOK_URL (public HTTPS base URL)")
+        return
+    
+    secret = os.environ.get("TELEGRAM_WEBHOOK_SECRET", "").strip() or secrets.token_urlsafe(32)
+    host = os.environ.get("TELEGRAM_WEBHOOK_HOST", "0.0.0.0")
+    port = int(os.environ.get("TELEGRAM_WEBHOOK_PORT", "8443"))
     
-    print("=" * 60)
+    await run_webhook(
+        handle_update,
+        session=session,
+        api=API,
+        public_url=public_url,
+        secret=secret,
+        allowed_updates=ALLOWED_UPDATES,
+        host=host,
+        port=port
+    )
+
+async def check_connection(session: aiohttp.ClientSession):
+    """Verify the bot token with getMe before starting; exits on failure."""
+    print("🔍 Testing Telegram API connection...")
+    try:
+        async with session.get(f"{API}/getMe", timeout=aiohttp.ClientTimeout(total=10)) as test_response:
+            test_response.raise_for_status()
+            test_data = _json_loads(await test_response.read())
+        
+        if test_data.get("ok"):
+            bot_info = test_data.get("result", {})
+            print(f"✅ Successfully connected to Telegram API")
+            print(f"   Bot username: @{bot_info.get('username', 'unknown')}")
+            print(f"   Bot name: {bot_info.get('first_name', 'unknown')}")
+        else:
+            error_desc = test_data.get("description", "Unknown error")
+            raise SystemExit(f"❌ ERROR: Telegram API test failed: {error_desc}\n"
+                           "Please check your TELEGRAM_BOT_TOKEN")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise SystemExit(f"❌ ERROR: Cannot connect to Telegram API: {e}\n"
+                        "Please check your internet connection and bot token")
+    except Exception as e:
+        raise SystemExit(f"❌ ERROR: Unexpected error during API test: {e}")
+
+async def poll_updates(session: aiohttp.ClientSession):
+    """Long-poll getUpdates and dispatch each update to a background task."""
+    offset = 0
     print("✅ Polling Telegram for messages...")
     print("   Send a message containing 'standing' and 'sheet' to trigger F1 workflow\n")
     
+    # A previously registered webhook makes getUpdates fail with 409
+    async with session.post(f"{API}/deleteWebhook", timeout=aiohttp.ClientTimeout(total=10)) as r:
+        await r.read()
+    
     while True:
         try:
-            r = requests.get(
+            async with session.get(
                 f"{API}/getUpdates", 
-                params={"timeout": 25, "offset": offset},
-                timeout=30  # Add timeout slightly longer than Telegram's timeout
-            )
-            r.raise_for_status()  # Raise exception for HTTP errors
-            data = r.json()
+                params={"timeout": POLL_TIMEOUT, "offset": offset, "allowed_updates": ALLOWED_UPDATES},
+                timeout=aiohttp.ClientTimeout(total=POLL_TIMEOUT + 5)  # Slightly longer than Telegram's timeout
+            ) as r:
+                r.raise_for_status()  # Raise exception for HTTP errors
+                data = _json_loads(await r.read())
             
             if not data.get("ok"):
                 error_code = data.get("error_code")
                 error_desc = data.get("description", "Unknown error")
-                print(f"[ERROR] Telegram API error (code {error_code}): {error_desc}")
+                logger.error("Telegram API error (code %s): %s", error_code, error_desc)
                 
                 # Handle specific error codes
                 if error_code == 401:
-                    print("[FATAL] Invalid bot token. Please check TELEGRAM_BOT_TOKEN in .env file")
+                    logger.critical("Invalid bot token. Please check TELEGRAM_BOT_TOKEN in .env file")
                     break
                 elif error_code == 409:
-                    print("[FATAL] Conflict: Another instance is running. Stop other instances.")
+                    logger.critical("Conflict: Another instance is running. Stop other instances.")
                     break
                 
-                time.sleep(5)
+                await asyncio.sleep(5)
                 continue
             
             for upd in data.get("result", []):
                 offset = upd["update_id"] + 1
-                msg = upd.get("message") or upd.get("edited_message")
-                if not msg: 
-                    continue
-                
-                chat_id = msg["chat"]["id"]
-                username = msg.get("from", {}).get("username", "unknown")
-                
-                print(f"\n[INFO] Received message from chat_id={chat_id}, username=@{username}")
                 
-                if CHAT_ID and str(chat_id) != str(CHAT_ID):
-                    print(f"[WARN] Ignoring message from unauthorized chat_id: {chat_id}")
-                    print(f"       Expected chat_id: {CHAT_ID}")
-                    print(f"       To accept messages from this chat, update TELEGRAM_CHAT_ID={chat_id} in your .env file")
-                    print(f"       Or remove TELEGRAM_CHAT_ID from .env to accept all chats")
-                    continue
-                
-                text = msg.get("text") or ""
-                if not text: 
-                    print("[INFO] Message has no text, skipping")
-                    continue
-                
-                try:
-                    print(f"[INFO] Processing message...")
-                    out = loop.run_until_complete(handle(text))
-                    print(f"[INFO] Sending response to chat_id={chat_id}")
-                    send(chat_id, out)
-                    print("[INFO] Response sent successfully")
-                except Exception as e:
-                    error_msg = "⚠️ Agent error. Check server logs."
-                    print(f"[ERROR] Exception in message handler: {e}")
-                    send(chat_id, error_msg)
-                    traceback.print_exc()
-        except KeyboardInterrupt:
-            print("\n\n[INFO] Bot stopped by user")
-            break
-        except requests.exceptions.Timeout:
-            print("[WARN] Request timed out. Retrying...")
-            time.sleep(2)
-        except requests.exceptions.ConnectionError as e:
-            print(f"[WARN] Connection error: {e}. Retrying in 5 seconds...")
-            time.sleep(5)
-        except requests.exceptions.RequestException as e:
-            print(f"[ERROR] Request error: {e}")
-            traceback.print_exc()
-            time.sleep(3)
+                # Handle in the background so the next long-poll overlaps with agent work
+                task = asyncio.create_task(handle_update(upd))
+                _tasks.add(task)
+                task.add_done_callback(_tasks.discard)
+        except asyncio.TimeoutError:
+            logger.warning("Request timed out. Retrying...")
+            await asyncio.sleep(2)
+        except aiohttp.ClientConnectionError as e:
+            logger.warning("Connection error: %s. Retrying in 5 seconds...", e)
+            await asyncio.sleep(5)
+        except aiohttp.ClientError as e:
+            logger.exception("Request error: %s", e)
+            await asyncio.sleep(3)
         except Exception as e:
-            print(f"[ERROR] Unexpected polling error: {e}")
-            traceback.print_exc()
-            time.sleep(3)
+            logger.exception("Unexpected polling error: %s", e)
+            await asyncio.sleep(3)
+
+async def main():
+    session = await get_session()
+    try:
+        await check_connection(session)
+        
+        print("=" * 60)
+        print("🤖 Telegram Bot Poller Started")
+        print("=" * 60)
+        print(f"Bot Token: {BOT_TOKEN[:20]}..." if BOT_TOKEN else "Bot Token: NOT SET")
+        print(f"Chat ID Filter: {CHAT_ID if CHAT_ID else 'None (accepting all chats)'}")
+        
+        if _SELF_EMAIL:
+            print(f"Self Email: {_SELF_EMAIL}")
+        else:
+            print("Self Email: ⚠️  NOT SET - F1 workflow will fail!")
+            print("             Add SELF_EMAIL=your_email@example.com to .env file")
+        
+        # Show SSE configuration
+        use_sse = os.environ.get('USE_SSE_MCP', 'true').lower() == 'true'
+        if use_sse:
+            print("MCP Mode: 🌐 SSE Servers (HTTP)")
+            print("          Make sure SSE servers are running: python start_sse_servers.py")
+        else:
+            print("MCP Mode: 📁 Direct stdio calls")
+        
+        print(f"Update Mode: {TELEGRAM_MODE}")
+        print("=" * 60)
+        
+        if TELEGRAM_MODE == "webhook":
+            await run_webhook_mode(session)
+        else:
+            await poll_updates(session)
+    finally:
+        await session.close()
 
 if __name__ == "__main__":
     if not BOT_TOKEN:
@@ -244,26 +397,7 @@ if __name__ == "__main__":
     if not BOT_TOKEN.strip():
         raise SystemExit("❌ ERROR: TELEGRAM_BOT_TOKEN is empty")
     
-    # Test API connection before starting the main loop
-    print("🔍 Testing Telegram API connection...")
     try:
-        test_response = requests.get(f"{API}/getMe", timeout=10)
-        test_response.raise_for_status()
-        test_data = test_response.json()
-        
-        if test_data.get("ok"):
-            bot_info = test_data.get("result", {})
-            print(f"✅ Successfully connected to Telegram API")
-            print(f"   Bot username: @{bot_info.get('username', 'unknown')}")
-            print(f"   Bot name: {bot_info.get('first_name', 'unknown')}")
-        else:
-            error_desc = test_data.get("description", "Unknown error")
-            raise SystemExit(f"❌ ERROR: Telegram API test failed: {error_desc}\n"
-                           "Please check your TELEGRAM_BOT_TOKEN")
-    except requests.exceptions.RequestException as e:
-        raise SystemExit(f"❌ ERROR: Cannot connect to Telegram API: {e}\n"
-                        "Please check your internet connection and bot token")
-    except Exception as e:
-        raise SystemExit(f"❌ ERROR: Unexpected error during API test: {e}")
-    
-    main()
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Bot stopped by user")
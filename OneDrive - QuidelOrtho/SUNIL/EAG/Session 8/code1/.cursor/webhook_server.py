@@ -0,0 +1,129 @@
+"""
+Telegram webhook receiver.
+
+Alternative to the getUpdates long-poll loop in telegram_poller.py: Telegram
+pushes each update to POST /tg/{secret} and the handler runs as a background
+task, so the request is acknowledged immediately and Telegram doesn't retry.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+import aiohttp
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Header Telegram echoes back with the secret_token given to setWebhook
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+UpdateHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def create_app(on_update: UpdateHandler, secret: str) -> web.Application:
+    """
+    Build the webhook application.
+    
+    Args:
+        on_update: Coroutine function called with each Telegram Update dict
+        secret: Shared secret expected in the URL path and secret-token header
+        
+    Returns:
+        aiohttp application exposing POST /tg/{secret}
+    """
+    tasks = set()
+    
+    async def handle_webhook(request: web.Request) -> web.Response:
+        if (request.match_info.get("secret") != secret
+                or request.headers.get(SECRET_HEADER) != secret):
+            return web.json_response({"error": "forbidden"}, status=403)
+        
+        try:
+            update = await request.json()
+        except Exception:
+            return web.json_response({"error": "invalid JSON"}, status=400)
+        
+        # Enqueue and acknowledge right away; each update gets its own task
+        task = asyncio.create_task(on_update(update))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        return web.json_response({})
+    
+    app = web.Application()
+    app.router.add_post("/tg/{secret}", handle_webhook)
+    return app
+
+
+async def set_webhook(
+    session: aiohttp.ClientSession,
+    api: str,
+    url: str,
+    secret: str,
+    allowed_updates: str
+) -> bool:
+    """
+    Register the webhook URL with Telegram.
+    
+    Args:
+        session: HTTP session for the Bot API
+        api: Bot API base URL (https://api.telegram.org/bot<token>)
+        url: Full public webhook URL
+        secret: Value Telegram should send in the secret-token header
+        allowed_updates: JSON-encoded list of update types to receive
+        
+    Returns:
+        True if Telegram accepted the webhook
+    """
+    async with session.post(
+        f"{api}/setWebhook",
+        data={"url": url, "secret_token": secret, "allowed_updates": allowed_updates},
+        timeout=aiohttp.ClientTimeout(total=10)
+    ) as response:
+        result = await response.json()
+    
+    if not result.get("ok"):
+        logger.error("setWebhook failed: %s", result.get("description", "Unknown error"))
+        return False
+    return True
+
+
+async def run_webhook(
+    on_update: UpdateHandler,
+    session: aiohttp.ClientSession,
+    api: str,
+    public_url: str,
+    secret: str,
+    allowed_updates: str,
+    host: str = "0.0.0.0",
+    port: int = 8443
+):
+    """
+    Register the webhook and serve updates until cancelled.
+    
+    Args:
+        on_update: Coroutine function called with each Telegram Update dict
+        session: HTTP session for the Bot API
+        api: Bot API base URL
+        public_url: Public HTTPS base URL that routes to this server
+        secret: Shared webhook secret
+        allowed_updates: JSON-encoded list of update types to receive
+        host: Bind host
+        port: Bind port
+    """
+    webhook_url = f"{public_url.rstrip('/')}/tg/{secret}"
+    if not await set_webhook(session, api, webhook_url, secret, allowed_updates):
+        return
+    
+    runner = web.AppRunner(create_app(on_update, secret))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    
+    print(f"✅ Webhook receiver listening on http://{host}:{port}/tg/<secret>")
+    print(f"   Telegram pushes updates to {public_url.rstrip('/')}/tg/<secret>\n")
+    
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
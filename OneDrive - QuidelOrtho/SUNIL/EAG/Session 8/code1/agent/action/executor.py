@@ -5,10 +5,192 @@ Orchestrates tool calls via MCP servers and manages execution state.
 """
 
 import asyncio
+import atexit
+import functools
+import json
+import logging
 import os
+import re
+import threading
+import time
 from typing import Dict, Any, List
 from datetime import datetime
-from ..models import ToolRequest, ToolResult, ExecutionPlan, PlanStep
+from ..models import ToolRequest, ToolResult, ExecutionPlan, PlanStep, SourceKind
+from ..decision.tool_selector import ToolSelector
+
+# Direct (non-SSE) servers; the Google client libraries are optional in SSE mode
+try:
+    from mcp_servers.google_sheets_stdio import GoogleSheetsServer
+    from mcp_servers.google_drive_stdio import GoogleDriveServer
+    from mcp_servers.gmail_stdio import GmailServer
+except ImportError:
+    GoogleSheetsServer = GoogleDriveServer = GmailServer = None
+
+try:
+    import orjson  # Optional; faster decoding of the standings feed
+    _json_loads = orjson.loads
+except ImportError:  # pragma: no cover
+    _json_loads = json.loads
+
+# Optional Lexbor (C) parser for the standings scraper; BeautifulSoup is the fallback
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# BeautifulSoup tree builder for the standings scraper: libxml2 is much faster than html.parser
+try:
+    from lxml import html as lxml_html
+    _BS4_PARSER = "lxml"
+except ImportError:
+    lxml_html = None
+    _BS4_PARSER = "html.parser"
+
+logger = logging.getLogger(__name__)
+
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+# Markdown table separator rows like |---|:---:| or | --- | --- |
+_TABLE_SEP_RE = re.compile(r"^\s*\|[-:\s|]+\|?\s*$")
+# Standings scraper: table class match and the last-resort text-line fallback
+_STANDINGS_CLASS_RE = re.compile(r"resultsarchive-table|standings")
+_TAG_RE = re.compile(r"<[^>]+>")
+_HSPACE_RE = re.compile(r"[^\S\n]+")
+_ROW_RE = re.compile(r"^ ?(\d+) ([A-Za-z .'-]+) ([A-Za-z .'-]+) (\d+) ?$", re.MULTILINE)
+# formula1.com driver standings pages map to this public JSON feed (Ergast-compatible API),
+# which returns the same table without rendering the page
+_F1_RESULTS_URL_RE = re.compile(
+    r"formula1\.com/(?:[a-z]{2}/)?results(?:\.html)?/(\d{4})/drivers(?:\.html)?/?(?:[?#]|$)"
+)
+_F1_STANDINGS_FEED = "https://api.jolpi.ca/ergast/f1/{year}/driverstandings.json"
+
+# Common selectors for F1 results tables, most specific first
+_TABLE_SELECTORS = [
+    "table.resultsarchive-table",
+    "table[class*='standings']",
+    "table[class*='results']",
+    ".resultsarchive-table",
+    "table"
+]
+# Async script: poll the live DOM every 100ms for the first selector that matches and
+# return that table's rows (header first), or null once the timeout (ms) passes
+_WAIT_TABLE_ROWS_JS = """
+const [selectors, timeoutMs, done] = arguments;
+const started = Date.now();
+(function poll() {
+    for (const sel of selectors) {
+        const t = document.querySelector(sel);
+        if (t) {
+            return done(Array.from(t.querySelectorAll("tr"))
+                .map(r => Array.from(r.querySelectorAll("td, th"), c => c.textContent.replace(/\\s+/g, " ").trim()))
+                .filter(cells => cells.length));
+        }
+    }
+    if (Date.now() - started > timeoutMs) return done(null);
+    setTimeout(poll, 100);
+})();
+"""
+
+# One headless Chrome shared by every standings scrape; starting it costs seconds.
+# Scrapes run in worker threads, so the driver is only touched under the lock.
+_chrome_driver = None
+_CHROME_LOCK = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def _chromedriver_path() -> str:
+    """Resolve the chromedriver binary once per process (re-checks for updates weekly)."""
+    from webdriver_manager.chrome import ChromeDriverManager
+    try:
+        # webdriver-manager 4.x moved the cache TTL onto the cache manager
+        from webdriver_manager.core.driver_cache import DriverCacheManager
+        manager = ChromeDriverManager(cache_manager=DriverCacheManager(valid_range=7))
+    except ImportError:
+        manager = ChromeDriverManager(cache_valid_range=7)
+    return manager.install()
+
+
+def _get_chrome_driver():
+    """Return the shared headless Chrome driver, starting it on first use (hold _CHROME_LOCK)."""
+    global _chrome_driver
+    if _chrome_driver is None:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.chrome.options import Options
+        
+        # Setup Chrome options for headless mode
+        chrome_options = Options()
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--window-size=1920,1080")
+        chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36")
+        
+        # Only the table DOM matters: return at DOMContentLoaded and skip images/CSS
+        # (the in-page wait for the table selector remains the readiness signal)
+        chrome_options.page_load_strategy = "eager"
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.stylesheets": 2
+        })
+        
+        # Initialize driver with webdriver-manager
+        service = Service(_chromedriver_path())
+        _chrome_driver = webdriver.Chrome(service=service, options=chrome_options)
+        # Leave headroom over the 10s in-page table wait
+        _chrome_driver.set_script_timeout(15)
+    return _chrome_driver
+
+
+def _quit_chrome_driver():
+    """Shut down the shared Chrome driver (next scrape starts a fresh one)."""
+    global _chrome_driver
+    if _chrome_driver is not None:
+        try:
+            _chrome_driver.quit()
+        except Exception:
+            pass
+        _chrome_driver = None
+
+
+atexit.register(_quit_chrome_driver)
+
+# Keep-alive HTTP session for page fetches (created on first use)
+_http_session = None
+_HTTP_SESSION_LOCK = threading.Lock()
+
+
+def _get_http_session():
+    """Return the shared requests.Session with pooled, retrying connections."""
+    global _http_session
+    with _HTTP_SESSION_LOCK:
+        if _http_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=16,
+                pool_maxsize=32,
+                max_retries=Retry(
+                    total=3,
+                    backoff_factor=0.3,
+                    status_forcelist=[429, 500, 502, 503, 504]
+                )
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "User-Agent": (
+                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                    "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+                )
+            })
+            _http_session = session
+        return _http_session
 
 
 class ToolExecutor:
@@ -32,6 +214,11 @@ class ToolExecutor:
             from mcp_servers.sse_client import get_client_pool
             self.client_pool = get_client_pool()
         
+        # Optional coalescing of concurrent calls to the same SSE server (0 = off)
+        self._batch_window = float(os.environ.get('MCP_BATCH_WINDOW_MS', '0')) / 1000.0
+        self._pending_calls: Dict[str, List[tuple]] = {}
+        self._flush_tasks = set()
+        
         self.tool_handlers = {
             "extract_webpage": self._extract_webpage,
             "extract_pdf": self._extract_pdf,
@@ -41,6 +228,18 @@ class ToolExecutor:
             "gmail_send": self._gmail_send,
             "telegram_send": self._telegram_send,
         }
+        
+        # Stateless apart from its compiled pattern, so one instance serves every step
+        self._selector = ToolSelector()
+        
+        # Read once per executor (after the entry point has loaded .env)
+        self._self_email = os.environ.get("SELF_EMAIL", "").strip()
+        
+        # Direct-call backends, created on first use and reused so credentials load once
+        self._ingestion = None
+        self._sheets = None
+        self._drive = None
+        self._gmail = None
     
     async def execute_tool(self, request: ToolRequest) -> ToolResult:
         """
@@ -93,38 +292,40 @@ class ToolExecutor:
         Returns:
             Tuple of (success, final_blackboard)
         """
-        completed_steps = []
+        completed_steps: set[str] = set()
         step_results = {}
         
         plan.status = "in_progress"
         
-        # Execute steps in dependency order
-        pending_steps = list(plan.steps)
+        # Index the DAG once: unmet dependency counts and reverse edges
+        in_degree: Dict[str, int] = {s.step_id: len(s.depends_on) for s in plan.steps}
+        dependents: Dict[str, List[PlanStep]] = {}
+        for step in plan.steps:
+            for dep in step.depends_on:
+                dependents.setdefault(dep, []).append(step)
         
-        while pending_steps:
-            # Find steps that can execute now
-            executable = [
-                step for step in pending_steps
-                if all(dep in completed_steps for dep in step.depends_on)
-            ]
+        # Execute steps in dependency order, one wavefront at a time
+        ready = [s for s in plan.steps if in_degree[s.step_id] == 0]
+        
+        while len(completed_steps) < len(plan.steps):
+            executable = ready
+            ready = []
             
             if not executable:
                 # Circular dependency or missing dependency
                 plan.status = "failed"
                 return False, blackboard
             
-            # Execute all independent steps in parallel
-            tasks = []
+            # Resolve and validate every step in this wavefront before launching any
+            tool_requests = []
             for step in executable:
                 step.status = "in_progress"
                 
                 # Resolve arguments
-                from ..decision.tool_selector import ToolSelector
-                selector = ToolSelector()
-                tool_request = selector.prepare_tool_request(step, blackboard, step_results)
+                tool_request = self._selector.prepare_tool_request(step, blackboard, step_results)
                 
                 # Validate
-                valid, error = selector.validate_tool_request(tool_request)
+                valid, error = self._selector.validate_tool_request(tool_request)
                 if not valid:
                     step.status = "failed"
                     step.result = ToolResult(
@@ -136,28 +337,45 @@ class ToolExecutor:
                     plan.status = "failed"
                     return False, blackboard
                 
-                # Execute
-                tasks.append((step, self.execute_tool(tool_request)))
+                tool_requests.append(tool_request)
             
-            # Wait for all parallel tasks
-            for step, task in tasks:
-                result = await task
+            # Execute all independent steps in parallel
+            results = await asyncio.gather(
+                *(self.execute_tool(req) for req in tool_requests),
+                return_exceptions=True
+            )
+            
+            wavefront_failed = False
+            for step, result in zip(executable, results):
+                if isinstance(result, BaseException):
+                    result = ToolResult(
+                        request_id=step.step_id,
+                        name=step.tool,
+                        success=False,
+                        error=str(result)
+                    )
                 step.result = result
                 
                 if result.success:
                     step.status = "completed"
-                    completed_steps.append(step.step_id)
+                    completed_steps.add(step.step_id)
                     step_results[step.step_id] = result.output
                     
+                    # Release dependents whose last dependency just finished
+                    for dependent in dependents.get(step.step_id, ()):
+                        in_degree[dependent.step_id] -= 1
+                        if in_degree[dependent.step_id] == 0:
+                            ready.append(dependent)
+                    
                     # Update blackboard with key outputs
                     self._update_blackboard(blackboard, step, result.output)
                 else:
                     step.status = "failed"
-                    plan.status = "failed"
-                    return False, blackboard
+                    wavefront_failed = True
             
-            # Remove completed steps from pending
-            pending_steps = [s for s in pending_steps if s not in executable]
+            if wavefront_failed:
+                plan.status = "failed"
+                return False, blackboard
         
         plan.status = "completed"
         plan.completed_at = datetime.now()
@@ -197,6 +415,92 @@ class ToolExecutor:
         # Also store under step ID for explicit reference
         blackboard[f"step_{step.step_id}"] = output
     
+    async def _call_mcp(self, server: str, tool: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Call a tool on an SSE MCP server.
+        
+        With MCP_BATCH_WINDOW_MS set, calls to the same server that arrive within
+        the window (e.g. one execute_plan wavefront) share a single HTTP round trip.
+        
+        Args:
+            server: Server name in the client pool
+            tool: Tool name on that server
+            arguments: Tool arguments
+            
+        Returns:
+            Tool result
+        """
+        if self._batch_window > 0:
+            result = await self._call_mcp_batched(server, tool, arguments)
+        else:
+            result = await self.client_pool.call_tool(
+                server_name=server,
+                tool_name=tool,
+                arguments=arguments
+            )
+        
+        if "error" in result:
+            raise RuntimeError(f"SSE server error: {result['error']}")
+        
+        return result
+    
+    async def _call_mcp_batched(self, server: str, tool: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a call for the server's current batch window and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending_calls.setdefault(server, [])
+        pending.append(({"name": tool, "arguments": arguments}, future))
+        
+        # First caller in a window schedules the flush
+        if len(pending) == 1:
+            loop.call_later(self._batch_window, self._schedule_flush, server)
+        
+        return await future
+    
+    def _schedule_flush(self, server: str):
+        """Start the flush for a server's batch window (called by the event loop timer)."""
+        task = asyncio.ensure_future(self._flush_mcp_batch(server))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+    
+    async def _flush_mcp_batch(self, server: str):
+        """Send all queued calls for a server and resolve their futures."""
+        batch = self._pending_calls.pop(server, [])
+        if not batch:
+            return
+        
+        try:
+            if len(batch) == 1:
+                call = batch[0][0]
+                results = [await self.client_pool.call_tool(
+                    server_name=server,
+                    tool_name=call["name"],
+                    arguments=call["arguments"]
+                )]
+            else:
+                results = await self.client_pool.call_tools_batch(
+                    server,
+                    [call for call, _ in batch]
+                )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+        
+        # A short result list would otherwise leave the remaining callers waiting forever
+        for _, future in batch[len(results):]:
+            if not future.done():
+                future.set_exception(RuntimeError(f"missing batch result from {server}"))
+    
     # Tool handler implementations (call MCP servers)
     
     async def _extract_webpage(self, args: Dict[str, Any]) -> Dict[str, Any]:
@@ -204,26 +508,11 @@ class ToolExecutor:
         
         # Use SSE client if enabled
         if self.use_sse and self.client_pool:
-            result = await self.client_pool.call_tool(
-                server_name="trafilatura",
-                tool_name="fetch_markdown",
-                arguments={"url": args["url"]}
-            )
-            
-            if "error" in result:
-                raise RuntimeError(f"SSE server error: {result['error']}")
-            
+            result = await self._call_mcp("trafilatura", "fetch_markdown", {"url": args["url"]})
             markdown = result.get("markdown", "")
-            rows = self._parse_markdown_table(markdown)
-            
-            # Fallback for F1 standings
-            if not rows or len(rows) < 2:
-                try:
-                    html_rows = self._extract_f1_standings_from_html(args["url"])
-                    if html_rows and len(html_rows) >= 2:
-                        rows = html_rows
-                except Exception as e:
-                    print(f"Warning: HTML extraction failed: {str(e)[:100]}")
+            rows = await self._rows_with_html_fallback(
+                self._parse_markdown_table(markdown), args["url"]
+            )
             
             return {
                 "markdown": markdown,
@@ -231,25 +520,16 @@ class ToolExecutor:
                 "url": args["url"]
             }
         
-        # Fallback to direct call
+        # Fallback to direct call (perception pulls in heavy deps, so import on demand)
         from ..perception.ingestion import DocumentIngestion
-        from ..models import SourceKind
         
-        ingestion = DocumentIngestion()
-        doc, markdown = ingestion.ingest_document(args["url"], SourceKind.HTML)
+        self._ingestion = self._ingestion or DocumentIngestion()
+        doc, markdown = self._ingestion.ingest_document(args["url"], SourceKind.HTML)
         
         # Parse markdown table if it exists (for F1 standings, etc.)
-        rows = self._parse_markdown_table(markdown)
-
-        # Fallback: if no rows parsed from markdown, try HTML parsing for F1 standings
-        if not rows or len(rows) < 2:
-            try:
-                html_rows = self._extract_f1_standings_from_html(args["url"])
-                if html_rows and len(html_rows) >= 2:
-                    rows = html_rows
-            except Exception as e:
-                # Log error but keep rows as-is if fallback fails
-                print(f"Warning: HTML extraction failed: {str(e)[:100]}")
+        rows = await self._rows_with_html_fallback(
+            self._parse_markdown_table(markdown), args["url"]
+        )
         
         return {
             "markdown": markdown,
@@ -257,13 +537,40 @@ class ToolExecutor:
             "rows": rows
         }
     
+    async def _rows_with_html_fallback(self, rows: List[List[str]], url: str) -> List[List[str]]:
+        """
+        Fall back to HTML parsing (F1 standings) when the markdown has no table.
+        
+        The fallback refetches the page with blocking I/O, so it runs in a worker
+        thread to keep other steps of the wavefront moving.
+        
+        Args:
+            rows: Rows parsed from the markdown
+            url: Page URL
+            
+        Returns:
+            The markdown rows if they form a table, else the HTML rows when usable
+        """
+        # Only a missing table (no data row) triggers the refetch
+        if rows and len(rows) >= 2:
+            return rows
+        
+        try:
+            html_rows = await asyncio.to_thread(self._extract_f1_standings_from_html, url)
+            if html_rows and len(html_rows) >= 2:
+                return html_rows
+        except Exception as e:
+            # Log error but keep rows as-is if fallback fails
+            logger.warning("HTML extraction failed: %.100s", e)
+        
+        return rows
+    
     async def _extract_pdf(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Extract PDF to markdown via MuPDF4LLM MCP server."""
         from ..perception.ingestion import DocumentIngestion
-        from ..models import SourceKind
         
-        ingestion = DocumentIngestion()
-        doc, markdown = ingestion.ingest_document(args["path"], SourceKind.PDF)
+        self._ingestion = self._ingestion or DocumentIngestion()
+        doc, markdown = self._ingestion.ingest_document(args["path"], SourceKind.PDF)
         
         return {
             "markdown": markdown,
@@ -286,26 +593,18 @@ class ToolExecutor:
         
         # Use SSE client if enabled
         if self.use_sse and self.client_pool:
-            result = await self.client_pool.call_tool(
-                server_name="google_sheets",
-                tool_name="upsert_table",
-                arguments=args
-            )
-            
-            if "error" in result:
-                raise RuntimeError(f"SSE server error: {result['error']}")
-            
-            return result
+            return await self._call_mcp("google_sheets", "upsert_table", args)
         
         # Fallback to direct call
         title = args["spreadsheet_title"]
         sheet_name = args["sheet_name"]
         rows = args["rows"]
 
-        from mcp_servers.google_sheets_stdio import GoogleSheetsServer
+        if GoogleSheetsServer is None:
+            raise RuntimeError("Google API client libraries are not installed; enable USE_SSE_MCP or install them")
 
-        server = GoogleSheetsServer()
-        result = await server.upsert_table(
+        self._sheets = self._sheets or GoogleSheetsServer()
+        result = await self._sheets.upsert_table(
             spreadsheet_title=title,
             sheet_name=sheet_name,
             rows=rows
@@ -318,8 +617,6 @@ class ToolExecutor:
     
     async def _google_drive_share(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Share Google Drive file via MCP server."""
-        import os
-        
         file_id = args["file_id"]
         role = args.get("role", "reader")
         share_type = args.get("type", "anyone")
@@ -327,10 +624,9 @@ class ToolExecutor:
         
         # If sharing with 'user' or 'group' type but no email provided, use SELF_EMAIL
         if share_type in ["user", "group"] and not email:
-            self_email = os.environ.get("SELF_EMAIL", "").strip()
-            if self_email:
-                email = self_email
-                print(f"[INFO] Using SELF_EMAIL for {share_type} share: {email}")
+            if self._self_email:
+                email = self._self_email
+                logger.info("Using SELF_EMAIL for %s share: %s", share_type, email)
             else:
                 raise RuntimeError(
                     f"Cannot share with type '{share_type}': email is required but not provided. "
@@ -339,27 +635,19 @@ class ToolExecutor:
         
         # Use SSE client if enabled
         if self.use_sse and self.client_pool:
-            result = await self.client_pool.call_tool(
-                server_name="google_drive",
-                tool_name="share",
-                arguments={
-                    "file_id": file_id,
-                    "role": role,
-                    "type": share_type,
-                    "email": email
-                }
-            )
-            
-            if "error" in result:
-                raise RuntimeError(f"SSE server error: {result['error']}")
-            
-            return result
+            return await self._call_mcp("google_drive", "share", {
+                "file_id": file_id,
+                "role": role,
+                "type": share_type,
+                "email": email
+            })
 
         # Fallback to direct call
-        from mcp_servers.google_drive_stdio import GoogleDriveServer
+        if GoogleDriveServer is None:
+            raise RuntimeError("Google API client libraries are not installed; enable USE_SSE_MCP or install them")
 
-        server = GoogleDriveServer()
-        result = await server.share(
+        self._drive = self._drive or GoogleDriveServer()
+        result = await self._drive.share(
             file_id=file_id,
             role=role,
             type=share_type,
@@ -373,17 +661,13 @@ class ToolExecutor:
     
     async def _gmail_send(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Send email via MCP server."""
-        import os
-        import re
-        
         to = args.get("to", "")
         
         # If "to" is empty, refers to "myself", or has unresolved placeholder, use SELF_EMAIL
         if not to or to.strip() in ["", "myself", "me"] or "{" in to:
-            self_email = os.environ.get("SELF_EMAIL", "").strip()
-            if self_email:
-                to = self_email
-                print(f"[INFO] Using SELF_EMAIL as recipient: {to}")
+            if self._self_email:
+                to = self._self_email
+                logger.info("Using SELF_EMAIL as recipient: %s", to)
             else:
                 raise RuntimeError(
                     "Cannot send email: recipient ('to') is required but not provided. "
@@ -391,8 +675,7 @@ class ToolExecutor:
                 )
         
         # Validate email format
-        email_pattern = r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"
-        if not re.search(email_pattern, to):
+        if not _EMAIL_RE.search(to):
             raise RuntimeError(
                 f"Invalid email address format: '{to}'. "
                 f"Please provide a valid email address or set SELF_EMAIL environment variable."
@@ -404,27 +687,19 @@ class ToolExecutor:
         
         # Use SSE client if enabled
         if self.use_sse and self.client_pool:
-            result = await self.client_pool.call_tool(
-                server_name="gmail",
-                tool_name="send",
-                arguments={
-                    "to": to,
-                    "subject": subject,
-                    "html": html,
-                    "attachments": attachments
-                }
-            )
-            
-            if "error" in result:
-                raise RuntimeError(f"SSE server error: {result['error']}")
-            
-            return result
+            return await self._call_mcp("gmail", "send", {
+                "to": to,
+                "subject": subject,
+                "html": html,
+                "attachments": attachments
+            })
 
         # Fallback to direct call
-        from mcp_servers.gmail_stdio import GmailServer
+        if GmailServer is None:
+            raise RuntimeError("Google API client libraries are not installed; enable USE_SSE_MCP or install them")
 
-        server = GmailServer()
-        result = await server.send(
+        self._gmail = self._gmail or GmailServer()
+        result = await self._gmail.send(
             to=to,
             subject=subject,
             html=html,
@@ -442,32 +717,28 @@ class ToolExecutor:
         text = args["text"]
         
         # Mock response
-        print(f"[MOCK] Sent Telegram message to {chat_id}")
-        print(f"[MOCK] Text: {text[:100]}...")
+        logger.info("[MOCK] Sent Telegram message to %s", chat_id)
+        logger.debug("[MOCK] Text: %.100s...", text)
         
         return {
             "ok": True,
             "chat_id": chat_id,
-            "message_id": int(datetime.now().timestamp())
+            "message_id": int(time.time())
         }
     
     
     def _parse_markdown_table(self, markdown: str) -> List[List[str]]:
         """Parse a markdown table into rows."""
-        import re
+        rows: List[List[str]] = []
         
-        lines = markdown.split('\n')
-        rows = []
-        
-        for line in lines:
-            # Check if line looks like a table row
-            if '|' in line and not line.strip().startswith('|-'):
-                # Parse cells
-                cells = [cell.strip() for cell in line.split('|')]
-                # Remove empty first/last cells from leading/trailing pipes
-                cells = [c for c in cells if c]
-                if cells:
-                    rows.append(cells)
+        for line in markdown.splitlines():
+            # Check if line looks like a table row (separator rows are skipped)
+            if '|' not in line or _TABLE_SEP_RE.match(line):
+                continue
+            # Parse cells, dropping empty first/last cells from leading/trailing pipes
+            cells = [c for c in (cell.strip() for cell in line.split('|')) if c]
+            if cells:
+                rows.append(cells)
         
         return rows
 
@@ -476,104 +747,59 @@ class ToolExecutor:
         Uses Selenium for JavaScript-rendered pages like formula1.com.
         Returns rows including header if found; otherwise empty list.
         """
-        import re
+        # formula1.com standings: read the JSON feed and skip HTML entirely
+        feed_match = _F1_RESULTS_URL_RE.search(url)
+        if feed_match:
+            try:
+                rows = self._rows_from_f1_feed(feed_match.group(1))
+                if len(rows) >= 2:
+                    return rows
+            except Exception as e:
+                logger.warning("F1 standings feed failed: %.100s, scraping page instead...", e)
         
-        # Try Selenium first for JavaScript-rendered pages
-        try:
-            from selenium import webdriver
-            from selenium.webdriver.chrome.service import Service
-            from selenium.webdriver.chrome.options import Options
-            from selenium.webdriver.common.by import By
-            from selenium.webdriver.support.ui import WebDriverWait
-            from selenium.webdriver.support import expected_conditions as EC
-            from webdriver_manager.chrome import ChromeDriverManager
-            
-            # Setup Chrome options for headless mode
-            chrome_options = Options()
-            chrome_options.add_argument("--headless=new")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--window-size=1920,1080")
-            chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36")
-            
-            # Initialize driver with webdriver-manager
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            
+        # Server-rendered pages: a plain HTTP fetch is enough and skips the browser
+        html = self._fetch_html(url)
+        if html and lxml_html is not None:
             try:
-                # Load page
-                driver.get(url)
-                
-                # Wait for table to load (up to 10 seconds)
-                wait = WebDriverWait(driver, 10)
-                # Common selectors for F1 results tables
-                table_selectors = [
-                    "table.resultsarchive-table",
-                    "table[class*='standings']",
-                    "table[class*='results']",
-                    ".resultsarchive-table",
-                    "table"
-                ]
-                
-                table_element = None
-                for selector in table_selectors:
-                    try:
-                        table_element = wait.until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                        )
-                        break
-                    except Exception:
-                        continue
-                
-                if not table_element:
-                    driver.quit()
-                    return []
-                
-                # Get rendered HTML
-                html = driver.page_source
-                driver.quit()
+                rows = self._table_rows_lxml(html)
+                if len(rows) >= 2:
+                    return rows
             except Exception as e:
-                driver.quit()
-                raise e
-                
+                logger.warning("lxml extraction failed: %.100s", e)
+        
+        # Table is rendered by JavaScript: use Selenium
+        try:
+            with _CHROME_LOCK:
+                driver = _get_chrome_driver()
+                try:
+                    # Load page
+                    driver.get(url)
+                    
+                    # Wait for the table (up to 10 seconds) and read its cells from the live
+                    # DOM in one call; polling runs in the page, not over the WebDriver wire
+                    rows = driver.execute_async_script(_WAIT_TABLE_ROWS_JS, _TABLE_SELECTORS, 10000)
+                except Exception:
+                    # Browser may be wedged or gone; start a fresh one next time
+                    _quit_chrome_driver()
+                    raise
+            
+            if not rows or len(rows) < 2:
+                return []
+            return rows
         except Exception as selenium_error:
-            # Fallback to requests if Selenium fails
-            print(f"Selenium extraction failed: {str(selenium_error)[:100]}, trying requests fallback...")
-            headers = {
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                    "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
-                )
-            }
-            try:
-                import requests
-                resp = requests.get(url, headers=headers, timeout=15)
-                if resp.status_code != 200 or not resp.text:
-                    return []
-                html = resp.text
-            except Exception:
+            # Fall back to the HTML fetched over plain HTTP if Selenium fails
+            logger.warning("Selenium extraction failed: %.100s, using fetched HTML instead...", selenium_error)
+            if not html:
                 return []
 
-        # Prefer BeautifulSoup if available
+        # Prefer selectolax, then lxml, then BeautifulSoup if available
         try:
-            from bs4 import BeautifulSoup  # type: ignore
-            soup = BeautifulSoup(html, "html.parser")
-
-            # Try to find table with specific class, then any table
-            table = soup.find("table", class_=re.compile(r"resultsarchive-table|standings"))
-            if not table:
-                # Fallback to first table element
-                table = soup.find("table")
-            if not table:
-                return []
-
-            # Extract all rows directly
-            all_rows: List[List[str]] = []
-            for tr in table.find_all("tr"):
-                cells = [cell.get_text(strip=True) for cell in tr.find_all(["td", "th"])]
-                if cells:
-                    all_rows.append(cells)
+            if LexborHTMLParser is not None:
+                all_rows = self._table_rows_lexbor(html)
+            elif lxml_html is not None:
+                all_rows = self._table_rows_lxml(html, any_table=True)
+            else:
+                all_rows = self._table_rows_bs4(html)
 
             if not all_rows or len(all_rows) < 2:
                 return []
@@ -583,15 +809,114 @@ class ToolExecutor:
         except Exception:
             # As a very last resort, attempt a regex-based extraction
             # Look for simple table-like lines with driver and points
-            lines = html.splitlines()
-            data: List[List[str]] = []
-            for line in lines:
-                line = re.sub(r"<[^>]+>", " ", line)
-                line = re.sub(r"\s+", " ", line).strip()
-                m = re.search(r"^(\d+)\s+([A-Za-z .'-]+)\s+([A-Za-z .'-]+)\s+(\d+)$", line)
-                if m:
-                    data.append([m.group(1), m.group(2), m.group(3), m.group(4)])
+            # (one pass over the whole page; lines stay separate so rows can't run together)
+            text = _HSPACE_RE.sub(" ", _TAG_RE.sub(" ", html))
+            data = [list(m) for m in _ROW_RE.findall(text)]
             if data:
                 return [["Position", "Driver", "Team", "Points"]] + data
             return []
+    
+    @staticmethod
+    def _rows_from_f1_feed(year: str) -> List[List[str]]:
+        """Build driver standings rows for a season from the JSON standings feed."""
+        resp = _get_http_session().get(_F1_STANDINGS_FEED.format(year=year), timeout=10)
+        resp.raise_for_status()
+        standings_lists = _json_loads(resp.content)["MRData"]["StandingsTable"]["StandingsLists"]
+        if not standings_lists:
+            return []
+        
+        rows = [["Position", "Driver", "Nationality", "Team", "Points"]]
+        for entry in standings_lists[0]["DriverStandings"]:
+            driver = entry["Driver"]
+            constructors = entry.get("Constructors") or [{}]
+            rows.append([
+                entry.get("position") or entry.get("positionText", ""),
+                f"{driver.get('givenName', '')} {driver.get('familyName', '')}".strip(),
+                driver.get("nationality", ""),
+                constructors[-1].get("name", ""),
+                entry.get("points", "")
+            ])
+        return rows
+    
+    @staticmethod
+    def _fetch_html(url: str) -> str:
+        """Fetch a page over plain HTTP; returns empty string on failure."""
+        try:
+            resp = _get_http_session().get(url, timeout=10)
+            if resp.status_code != 200:
+                return ""
+            return resp.text
+        except Exception:
+            return ""
+    
+    @staticmethod
+    def _table_rows_lxml(html: str, any_table: bool = False) -> List[List[str]]:
+        """
+        Extract the standings table rows with lxml XPath.
+        
+        Args:
+            html: Page HTML
+            any_table: Fall back to the first table when no standings/results-archive table exists
+            
+        Returns:
+            Rows of cell text (header first), or empty list if no table found
+        """
+        tree = lxml_html.fromstring(html)
+        trs = tree.xpath(
+            "(//table[contains(@class,'resultsarchive-table') or contains(@class,'standings')])[1]//tr"
+        )
+        if not trs and any_table:
+            trs = tree.xpath("(//table)[1]//tr")
+        
+        all_rows: List[List[str]] = []
+        for tr in trs:
+            cells = [" ".join(cell.text_content().split()) for cell in tr.xpath("./td|./th")]
+            if cells:
+                all_rows.append(cells)
+        return all_rows
+    
+    @staticmethod
+    def _table_rows_lexbor(html: str) -> List[List[str]]:
+        """Extract the standings table rows with selectolax's Lexbor parser."""
+        tree = LexborHTMLParser(html)
+        
+        # Try to find table with specific class, then any table
+        table = (
+            tree.css_first("table[class*='resultsarchive-table'], table[class*='standings']")
+            or tree.css_first("table")
+        )
+        if table is None:
+            return []
+        
+        all_rows: List[List[str]] = []
+        for tr in table.css("tr"):
+            cells = [cell.text(strip=True) for cell in tr.css("td, th")]
+            if cells:
+                all_rows.append(cells)
+        return all_rows
+    
+    @staticmethod
+    def _table_rows_bs4(html: str) -> List[List[str]]:
+        """Extract the standings table rows with BeautifulSoup."""
+        from bs4 import BeautifulSoup  # type: ignore
+        soup = BeautifulSoup(html, _BS4_PARSER)
 
+        # Try to find table with specific class, then any table
+        table = soup.find("table", class_=_STANDINGS_CLASS_RE)
+        if not table:
+            # Fallback to first table element
+            table = soup.find("table")
+        if not table:
+            return []
+
+        # Extract all rows directly; leaf cells (<td>Hamilton</td>) skip the descendant walk,
+        # others join stripped strings (same result as get_text(strip=True) without the list)
+        all_rows: List[List[str]] = []
+        for tr in table.find_all("tr"):
+            cells = [
+                cell.string.strip() if cell.string is not None else "".join(cell.stripped_strings)
+                for cell in tr.find_all(["td", "th"])
+            ]
+            if cells:
+                all_rows.append(cells)
+        return all_rows
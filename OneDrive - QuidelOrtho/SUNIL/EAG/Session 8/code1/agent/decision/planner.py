@@ -4,14 +4,79 @@ Multi-step task planner.
 Analyzes user intent, breaks down into execution steps, and creates a plan graph.
 """
 
+import json
+import os
+import re
 import uuid
 from typing import List, Dict, Any, Optional
 try:
     from google import genai  # Optional; planner can run without it
 except Exception:  # pragma: no cover
     genai = None
+try:
+    import orjson  # Optional; faster decoding of LLM plan responses
+    _json_loads = orjson.loads
+except ImportError:  # pragma: no cover
+    _json_loads = json.loads
 from ..models import ExecutionPlan, PlanStep, ToolRequest
 
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+# JSON array inside a ```json (or bare ```) fence in an LLM response
+_JSON_BLOCK_RE = re.compile(r"```(?:json)?\s*(\[.*?\])\s*```", re.DOTALL)
+
+
+def _parse_steps_json(response_text: str) -> List[Dict[str, Any]]:
+    """Decode the JSON step array from an LLM response, with or without a code fence."""
+    match = _JSON_BLOCK_RE.search(response_text)
+    return _json_loads(match.group(1) if match else response_text)
+
+
+# Static parts of the step-planning prompt; only the tool list, goal and context vary
+_PROMPT_HEAD = """You are a task planning assistant. Given a user goal, break it down into a sequence of concrete execution steps.
+
+Available tools:
+"""
+
+_PROMPT_TAIL = """
+
+Generate a step-by-step execution plan. For each step:
+1. Assign a step_id (step1, step2, etc.)
+2. Select the appropriate tool
+3. Specify tool arguments (use placeholders like {prev_step_output} for values from previous steps)
+4. List dependencies (step_ids this step depends on)
+5. Provide a clear description
+
+Format your response as a JSON array of steps:
+[
+  {
+    "step_id": "step1",
+    "tool": "tool_name",
+    "args": {"arg1": "value1"},
+    "depends_on": [],
+    "description": "Human-readable description"
+  },
+  ...
+]
+
+Important:
+- For multi-step tasks, ensure proper dependency ordering
+- Use descriptive step_ids
+- You MUST only use tools from the Available tools list above
+- NEVER use tools like "python", "execute", "run", or any tool not in the Available tools list
+- For F1 standings: use extract_webpage with URL https://www.formula1.com/en/results/2025/drivers to scrape the driver standings table
+- For Google Sheets: use google_sheets_upsert with spreadsheet_title, sheet_name, rows
+- For sharing: use google_drive_share with file_id from previous step
+  * For public sharing (anyone with link): {"type": "anyone", "role": "reader"}
+  * For private sharing with user: {"type": "user", "role": "reader"} (email will be auto-populated from SELF_EMAIL)
+  * Default to type="anyone" unless explicitly sharing with specific person
+- For emails: use gmail_send with to, subject, html, and optional attachments
+  * When sending to "myself" or "self", leave "to" field empty or use "myself" - it will be auto-populated from SELF_EMAIL
+  * For sending to others, provide explicit email address in "to" field
+
+CRITICAL: Only use tool names exactly as listed in "Available tools" above. Invalid tool names will cause the plan to fail.
+
+Respond with ONLY the JSON array, no additional text."""
+
 
 class TaskPlanner:
     """Plans multi-step task execution."""
@@ -41,6 +106,11 @@ class TaskPlanner:
             "gmail_send": "Send email via Gmail with optional attachments",
             "telegram_send": "Send message to Telegram chat",
         }
+        
+        # The catalog is fixed after init, so build its prompt text and lookup set once
+        self._tool_catalog_prompt = "\n".join(f"  - {name}: {desc}" for name, desc in self.tool_catalog.items())
+        self._valid_tools = frozenset(self.tool_catalog)
+        self._prompt_head = _PROMPT_HEAD + self._tool_catalog_prompt + "\n\nUser goal: "
     
     def create_plan(self, goal: str, context: Dict[str, Any] = None) -> ExecutionPlan:
         """
@@ -79,6 +149,10 @@ class TaskPlanner:
         Returns:
             List of plan steps with dependencies
         """
+        # If LLM client unavailable, use rule-based fallback
+        if self.client is None:
+            return self._rule_based_plan(goal)
+        
         # Build context string
         context_str = ""
         if context:
@@ -86,57 +160,7 @@ class TaskPlanner:
             for key, value in context.items():
                 context_str += f"  {key}: {value}\n"
         
-        # Build tool catalog string
-        tools_str = "\n".join([f"  - {name}: {desc}" for name, desc in self.tool_catalog.items()])
-        
-        prompt = f"""You are a task planning assistant. Given a user goal, break it down into a sequence of concrete execution steps.
-
-Available tools:
-{tools_str}
-
-User goal: {goal}{context_str}
-
-Generate a step-by-step execution plan. For each step:
-1. Assign a step_id (step1, step2, etc.)
-2. Select the appropriate tool
-3. Specify tool arguments (use placeholders like {{prev_step_output}} for values from previous steps)
-4. List dependencies (step_ids this step depends on)
-5. Provide a clear description
-
-Format your response as a JSON array of steps:
-[
-  {{
-    "step_id": "step1",
-    "tool": "tool_name",
-    "args": {{"arg1": "value1"}},
-    "depends_on": [],
-    "description": "Human-readable description"
-  }},
-  ...
-]
-
-Important:
-- For multi-step tasks, ensure proper dependency ordering
-- Use descriptive step_ids
-- You MUST only use tools from the Available tools list above
-- NEVER use tools like "python", "execute", "run", or any tool not in the Available tools list
-- For F1 standings: use extract_webpage with URL https://www.formula1.com/en/results/2025/drivers to scrape the driver standings table
-- For Google Sheets: use google_sheets_upsert with spreadsheet_title, sheet_name, rows
-- For sharing: use google_drive_share with file_id from previous step
-  * For public sharing (anyone with link): {{"type": "anyone", "role": "reader"}}
-  * For private sharing with user: {{"type": "user", "role": "reader"}} (email will be auto-populated from SELF_EMAIL)
-  * Default to type="anyone" unless explicitly sharing with specific person
-- For emails: use gmail_send with to, subject, html, and optional attachments
-  * When sending to "myself" or "self", leave "to" field empty or use "myself" - it will be auto-populated from SELF_EMAIL
-  * For sending to others, provide explicit email address in "to" field
-
-CRITICAL: Only use tool names exactly as listed in "Available tools" above. Invalid tool names will cause the plan to fail.
-
-Respond with ONLY the JSON array, no additional text."""
-
-        # If LLM client unavailable, use rule-based fallback
-        if self.client is None:
-            return self._rule_based_plan(goal)
+        prompt = self._prompt_head + f"{goal}{context_str}" + _PROMPT_TAIL
 
         try:
             response = self.client.models.generate_content(
@@ -144,21 +168,12 @@ Respond with ONLY the JSON array, no additional text."""
                 contents=prompt
             )
             
-            # Parse response
-            import json
-            response_text = response.text.strip()
-            
-            # Extract JSON array from response (handle markdown code blocks)
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0].strip()
-            
-            steps_data = json.loads(response_text)
+            # Parse response (handles markdown code blocks)
+            steps_data = _parse_steps_json(response.text.strip())
             
             # Convert to PlanStep objects with validation
             steps = []
-            valid_tools = set(self.tool_catalog.keys())
+            valid_tools = self._valid_tools
             
             for step_data in steps_data:
                 tool_name = step_data.get("tool", "")
@@ -194,9 +209,7 @@ Respond with ONLY the JSON array, no additional text."""
         lowered = goal.lower()
 
         if "f1" in lowered and ("standings" in lowered or "driver" in lowered):
-            import re
-            import os
-            email_match = re.search(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", goal)
+            email_match = _EMAIL_RE.search(goal)
             # Use SELF_EMAIL from environment, or email found in goal, or placeholder
             to_email = email_match.group(0) if email_match else os.environ.get("SELF_EMAIL", "your_email@example.com")
             # Get F1 URL from environment or use 2025 default
@@ -290,19 +303,11 @@ Generate a refined plan to address the issue. Respond with a JSON array of steps
                 contents=prompt
             )
             
-            import json
-            response_text = response.text.strip()
-            
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0].strip()
-            
-            steps_data = json.loads(response_text)
+            steps_data = _parse_steps_json(response.text.strip())
             
             # Update plan with refined steps (with validation)
             new_steps = []
-            valid_tools = set(self.tool_catalog.keys())
+            valid_tools = self._valid_tools
             
             for step_data in steps_data:
                 tool_name = step_data.get("tool", "")
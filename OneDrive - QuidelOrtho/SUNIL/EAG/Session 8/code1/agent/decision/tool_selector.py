@@ -5,16 +5,19 @@ Resolves placeholder arguments from blackboard and previous step outputs.
 """
 
 import re
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Set
 from ..models import PlanStep, ToolRequest
 
+_PLACEHOLDER_RE = re.compile(r'\{([^}]+)\}')
+_STEP_OUTPUT_RE = re.compile(r"^step\d+_output$")
+
 
 class ToolSelector:
     """Selects and prepares tools for execution."""
     
     def __init__(self):
         """Initialize tool selector."""
-        self.placeholder_pattern = re.compile(r'\{([^}]+)\}')
+        self.placeholder_pattern = _PLACEHOLDER_RE
     
     def prepare_tool_request(
         self,
@@ -75,53 +78,12 @@ class ToolSelector:
         
         for key, value in args.items():
             if isinstance(value, str):
-                # Find all placeholders in the string
-                matches = self.placeholder_pattern.findall(value)
-                for ph in matches:
-                    # Handle {prev_step_output} and {step_output}
-                    if ph in ("prev_step_output", "step_output", "previous_output"):
-                        # Most recent dependency step
-                        prev_step_id = None
-                        for dep_id in reversed(depends_on):
-                            if dep_id in step_results:
-                                prev_step_id = dep_id
-                                break
-                        if prev_step_id:
-                            prev_output = step_results[prev_step_id]
-                            if "rows" in prev_output:
-                                value = value.replace(f"{{{ph}}}", f"{{{prev_step_id}.rows}}")
-                            elif "data_rows" in prev_output:
-                                value = value.replace(f"{{{ph}}}", f"{{{prev_step_id}.data_rows}}")
-                            elif "output" in prev_output:
-                                value = value.replace(f"{{{ph}}}", f"{{{prev_step_id}.output}}")
-                            else:
-                                keys = list(prev_output.keys())
-                                if keys:
-                                    value = value.replace(f"{{{ph}}}", f"{{{prev_step_id}.{keys[0]}}}")
-                    # Handle {stepN_output} → {stepN.rows} or similar
-                    elif re.match(r"^step\d+_output$", ph):
-                        step_id = ph.split("_")[0]  # e.g., step1_output -> step1
-                        if step_id in step_results:
-                            out = step_results[step_id]
-                            if "rows" in out:
-                                value = value.replace(f"{{{ph}}}", f"{{{step_id}.rows}}")
-                            elif "data_rows" in out:
-                                value = value.replace(f"{{{ph}}}", f"{{{step_id}.data_rows}}")
-                            elif "output" in out:
-                                value = value.replace(f"{{{ph}}}", f"{{{step_id}.output}}")
-                            else:
-                                keys = list(out.keys())
-                                if keys:
-                                    value = value.replace(f"{{{ph}}}", f"{{{step_id}.{keys[0]}}}")
-                
-                preprocessed[key] = value
+                preprocessed[key] = self._preprocess_string(value, depends_on, step_results)
             elif isinstance(value, list):
                 preprocessed_list = []
                 for v in value:
                     if isinstance(v, str):
-                        # Recursively preprocess strings in lists
-                        preprocessed_item = self._preprocess_placeholders({"temp": v}, depends_on, step_results)["temp"]
-                        preprocessed_list.append(preprocessed_item)
+                        preprocessed_list.append(self._preprocess_string(v, depends_on, step_results))
                     elif isinstance(v, dict):
                         preprocessed_list.append(self._preprocess_placeholders(v, depends_on, step_results))
                     else:
@@ -134,6 +96,45 @@ class ToolSelector:
         
         return preprocessed
     
+    def _preprocess_string(
+        self,
+        value: str,
+        depends_on: List[str],
+        step_results: Dict[str, Dict[str, Any]]
+    ) -> str:
+        """Rewrite generic output placeholders in one string to {stepN.key} references."""
+        # Literal strings (the common case) have nothing to rewrite
+        if "{" not in value:
+            return value
+        
+        for ph in self.placeholder_pattern.findall(value):
+            # Handle {prev_step_output} and {step_output}
+            if ph in ("prev_step_output", "step_output", "previous_output"):
+                # Most recent dependency step
+                step_id = next((dep for dep in reversed(depends_on) if dep in step_results), None)
+            # Handle {stepN_output} → {stepN.rows} or similar
+            elif _STEP_OUTPUT_RE.match(ph):
+                step_id = ph.split("_")[0]  # e.g., step1_output -> step1
+                if step_id not in step_results:
+                    step_id = None
+            else:
+                continue
+            
+            if step_id:
+                out_key = self._pick_output_key(step_results[step_id])
+                if out_key:
+                    value = value.replace(f"{{{ph}}}", f"{{{step_id}.{out_key}}}")
+        
+        return value
+    
+    @staticmethod
+    def _pick_output_key(output: Dict[str, Any]) -> Optional[str]:
+        """Choose which key of a step's output a generic placeholder refers to."""
+        for key in ("rows", "data_rows", "output"):
+            if key in output:
+                return key
+        return next(iter(output), None)
+    
     def _resolve_arguments(
         self,
         args: Dict[str, Any],
@@ -180,6 +181,10 @@ class ToolSelector:
         step_results: Dict[str, Dict[str, Any]]
     ) -> Any:
         """Resolve a single string value with placeholders."""
+        # Literal strings (most args) can't contain a placeholder
+        if "{" not in value:
+            return value
+        
         # Find all placeholders
         matches = self.placeholder_pattern.findall(value)
         
@@ -284,20 +289,17 @@ class ToolSelector:
     def can_execute_step(
         self,
         step: PlanStep,
-        completed_steps: List[str]
+        completed_steps: Set[str]
     ) -> bool:
         """
         Check if a step's dependencies are satisfied.
         
         Args:
             step: Step to check
-            completed_steps: List of completed step IDs
+            completed_steps: Set of completed step IDs (O(1) membership checks)
             
         Returns:
             True if all dependencies are met
         """
-        for dep in step.depends_on:
-            if dep not in completed_steps:
-                return False
-        return True
+        return all(dep in completed_steps for dep in step.depends_on)
 
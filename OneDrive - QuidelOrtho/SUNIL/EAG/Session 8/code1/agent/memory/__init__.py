@@ -4,7 +4,15 @@ Memory Layer: FAISS vector store, working memory, and scratchpad.
 
 from .vector_store import FAISSVectorStore
 from .scratchpad import MemoryScratchpad
+from .semantic_cache import SemanticQueryCache
+from .sqlite_scratchpad import SQLiteMemoryScratchpad
 from .working_memory import WorkingMemoryManager
 
-__all__ = ["FAISSVectorStore", "MemoryScratchpad", "WorkingMemoryManager"]
+__all__ = [
+    "FAISSVectorStore",
+    "MemoryScratchpad",
+    "SemanticQueryCache",
+    "SQLiteMemoryScratchpad",
+    "WorkingMemoryManager",
+]
 
@@ -3,12 +3,89 @@ Long-term memory scratchpad stored as JSONL.
 Persists conversation history, tool results, and notes.
 """
 
+import hashlib
+import heapq
 import json
+import logging
+import mmap
+import os
+import pickle
+import re
+import threading
+from operator import itemgetter
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from ..models import MemoryEntry
 
+try:
+    import orjson  # Optional; C-backed JSON for the per-line encode/decode
+    _json_loads = orjson.loads
+    
+    def _json_line(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+except ImportError:  # pragma: no cover
+    _json_loads = json.loads
+    
+    def _json_line(obj) -> bytes:
+        return (json.dumps(obj) + '\n').encode('utf-8')
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of the pickled sidecar cache changes
+_CACHE_VERSION = 5
+# Bytes just before the indexed size that are hashed to recognise the same file
+_FINGERPRINT_BYTES = 4096
+# Persist the sidecar after this many entries were indexed since the last save;
+# anything newer is recovered from the JSONL tail on the next start.
+_CACHE_FLUSH_EVERY = 1000
+
+_by_timestamp = itemgetter('timestamp')
+
+# O_BINARY keeps Windows from translating the newlines we write
+_APPEND_FLAGS = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+
+
+def _copy_bytes(src, dst, length: int, chunk_size: int = 1 << 20):
+    """Copy exactly `length` bytes from src to dst in bounded chunks."""
+    while length > 0:
+        chunk = src.read(min(chunk_size, length))
+        if not chunk:
+            break
+        dst.write(chunk)
+        length -= len(chunk)
+
+
+def _copy_range(src, dst, offset: int, length: int):
+    """
+    Copy src[offset:offset + length] to the end of dst.
+    
+    Uses sendfile(2) where available so retained ranges never pass through
+    user space; falls back to a chunked read/write copy.
+    
+    Args:
+        src: Source file opened 'rb'
+        dst: Destination file opened 'wb' (written only through this helper)
+        offset: Byte offset in src
+        length: Number of bytes to copy
+    """
+    if length <= 0:
+        return
+    if hasattr(os, 'sendfile'):
+        dst.flush()
+        try:
+            while length > 0:
+                sent = os.sendfile(dst.fileno(), src.fileno(), offset, length)
+                if sent == 0:
+                    return
+                offset += sent
+                length -= sent
+            return
+        except OSError:
+            pass  # e.g. unsupported filesystem: copy the remainder below
+    src.seek(offset)
+    _copy_bytes(src, dst, length)
+
 
 class MemoryScratchpad:
     """JSONL-based long-term memory storage."""
@@ -26,6 +103,195 @@ class MemoryScratchpad:
         # Create file if it doesn't exist
         if not self.scratchpad_path.exists():
             self.scratchpad_path.touch()
+        
+        # Pre-parsed entries (model_dump dicts, file order), their byte offsets
+        # in the JSONL, and conversation -> positions
+        self.cache_path = self.scratchpad_path.with_suffix('.cache')
+        self._entries: List[dict] = []
+        self._offsets: List[int] = []
+        self._by_conv: Dict[str, List[int]] = {}
+        # True while timestamps are non-decreasing in file order (the normal case),
+        # which lets readers take the tail instead of sorting
+        self._in_order = True
+        # entry_type -> count, kept current so get_stats is O(1)
+        self._type_counts: Dict[str, int] = {}
+        self._size = 0
+        self._mtime = 0.0
+        self._unsaved = 0
+        # Appends run in a worker thread while reads stay on the event loop;
+        # every public method holds this so the index is never seen half-updated
+        self._lock = threading.Lock()
+        
+        self._load_cache()
+        self._refresh()
+    
+    def _reset_index(self):
+        self._entries = []
+        self._offsets = []
+        self._by_conv = {}
+        self._in_order = True
+        self._type_counts = {}
+        self._size = 0
+        self._mtime = 0.0
+    
+    def _load_cache(self):
+        """Adopt the sidecar cache if it still describes a prefix of the JSONL file."""
+        try:
+            with open(self.cache_path, 'rb') as f:
+                cache = pickle.load(f)
+            if cache.get('version') != _CACHE_VERSION:
+                return
+            st = self.scratchpad_path.stat()
+        except Exception:
+            return  # Missing or unreadable cache: rebuilt from the JSONL
+        
+        # Shrunk, or same size with a different mtime: the file was rewritten
+        if cache['size'] > st.st_size:
+            return
+        if cache['size'] == st.st_size and cache['mtime'] != st.st_mtime:
+            return
+        # Grown, but the indexed prefix no longer holds the same bytes: rewritten larger
+        try:
+            if cache['fingerprint'] != self._prefix_digest(cache['size']):
+                return
+        except OSError:
+            return
+        
+        self._entries = cache['entries']
+        self._offsets = cache['offsets']
+        self._by_conv = cache['by_conv']
+        self._in_order = cache['in_order']
+        self._type_counts = cache['type_counts']
+        self._size = cache['size']
+        self._mtime = cache['mtime']
+    
+    def _prefix_digest(self, size: int) -> bytes:
+        """Hash the last _FINGERPRINT_BYTES bytes before `size` in the JSONL file."""
+        start = max(0, size - _FINGERPRINT_BYTES)
+        with open(self.scratchpad_path, 'rb') as f:
+            f.seek(start)
+            return hashlib.blake2b(f.read(size - start), digest_size=16).digest()
+    
+    def _save_cache(self):
+        """
+        Write the sidecar cache atomically (temp file + rename).
+        
+        The sidecar holds a second, pickled copy of every parsed entry: it trades
+        disk space for skipping the JSON parse on start, not memory.
+        """
+        try:
+            fingerprint = self._prefix_digest(self._size)
+        except OSError as e:
+            logger.warning("Failed to write scratchpad cache: %s", e)
+            return
+        cache = {
+            'version': _CACHE_VERSION,
+            'size': self._size,
+            'mtime': self._mtime,
+            'fingerprint': fingerprint,
+            'entries': self._entries,
+            'offsets': self._offsets,
+            'by_conv': self._by_conv,
+            'in_order': self._in_order,
+            'type_counts': self._type_counts,
+        }
+        tmp_path = self.cache_path.with_suffix('.cache.tmp')
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_path)
+            self._unsaved = 0
+        except OSError as e:
+            logger.warning("Failed to write scratchpad cache: %s", e)
+    
+    def _add_record(self, record: dict, offset: int):
+        if self._in_order and self._entries and record['timestamp'] < self._entries[-1]['timestamp']:
+            self._in_order = False
+        self._by_conv.setdefault(record['conversation_id'], []).append(len(self._entries))
+        entry_type = record['entry_type']
+        self._type_counts[entry_type] = self._type_counts.get(entry_type, 0) + 1
+        self._entries.append(record)
+        self._offsets.append(offset)
+        self._unsaved += 1
+    
+    def _index_range(self, buf, start: int, end: int):
+        """
+        Parse the complete JSONL lines in buf[start:end] into the index.
+        
+        Args:
+            buf: Mapped file (or bytes) indexed by file offset
+            start: Offset of the first line
+            end: Offset just past the last newline to consume
+        """
+        errors = 0
+        first_error = None
+        pos = start
+        while pos < end:
+            line_offset = pos
+            nl = buf.find(b'\n', pos, end)
+            line = buf[pos:nl]
+            pos = nl + 1
+            if not line.strip():
+                continue
+            try:
+                record = self._decode_entry(_json_loads(line)).model_dump()
+            except Exception as e:
+                errors += 1
+                first_error = first_error or e
+                continue
+            self._add_record(record, line_offset)
+        
+        # One warning per batch, not per bad line, so a corrupt file cannot flood the log
+        if errors:
+            logger.warning("Skipped %d unparseable scratchpad entries (first error: %s)", errors, first_error)
+    
+    def _refresh(self):
+        """Bring the in-memory index up to date, parsing only bytes past the cached size."""
+        st = self.scratchpad_path.stat()
+        if st.st_size == self._size and st.st_mtime == self._mtime:
+            return
+        if st.st_size <= self._size:
+            # Truncated or rewritten outside this instance: start over
+            self._reset_index()
+        
+        if st.st_size > self._size:
+            # Scan the mapped file in place: lines are sliced straight out of the
+            # page cache instead of reading the whole tail and splitting a copy of it
+            with open(self.scratchpad_path, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Only consume complete lines; a half-written last line is picked up later
+                end = mm.rfind(b'\n', self._size) + 1
+                if end:
+                    self._index_range(mm, self._size, end)
+                    self._size = end
+        self._mtime = st.st_mtime
+        
+        if self._unsaved >= _CACHE_FLUSH_EVERY or not self.cache_path.exists():
+            self._save_cache()
+    
+    @staticmethod
+    def _encode_record(record: dict) -> bytes:
+        """Serialize a model_dump() record as one JSONL line (bytes, newline included)."""
+        # Handle datetime serialization without touching the indexed record
+        return _json_line({**record, 'timestamp': record['timestamp'].isoformat()})
+    
+    @classmethod
+    def _encode_entry(cls, entry: MemoryEntry) -> bytes:
+        """Serialize an entry as one JSONL line (bytes, newline included)."""
+        return cls._encode_record(entry.model_dump())
+    
+    @staticmethod
+    def _decode_entry(data: dict) -> MemoryEntry:
+        """Build a MemoryEntry from a decoded JSONL record."""
+        # Parse timestamp
+        data['timestamp'] = datetime.fromisoformat(data['timestamp'])
+        return MemoryEntry(**data)
+    
+    @staticmethod
+    def _to_entry(record: dict) -> MemoryEntry:
+        """Rebuild an indexed record without re-validating it (it was validated when indexed)."""
+        # Fresh meta dict so callers cannot mutate the cached record through the entry
+        return MemoryEntry.model_construct(**{**record, 'meta': dict(record['meta'])})
     
     def append(self, entry: MemoryEntry):
         """
@@ -34,20 +300,47 @@ class MemoryScratchpad:
         Args:
             entry: Memory entry to append
         """
-        with open(self.scratchpad_path, 'a', encoding='utf-8') as f:
-            # Convert to dict and handle datetime serialization
-            entry_dict = entry.model_dump()
-            entry_dict['timestamp'] = entry.timestamp.isoformat()
-            
-            f.write(json.dumps(entry_dict) + '\n')
+        with self._lock:
+            self._write([entry])
     
     def append_batch(self, entries: List[MemoryEntry]):
         """Append multiple entries efficiently."""
-        with open(self.scratchpad_path, 'a', encoding='utf-8') as f:
-            for entry in entries:
-                entry_dict = entry.model_dump()
-                entry_dict['timestamp'] = entry.timestamp.isoformat()
-                f.write(json.dumps(entry_dict) + '\n')
+        with self._lock:
+            self._write(entries)
+    
+    def _write(self, entries: List[MemoryEntry]):
+        """Append entries and index them at the offsets they were written to."""
+        # Pick up writes from elsewhere first so our offsets continue the index
+        self._refresh()
+        records = [entry.model_dump() for entry in entries]
+        encode = self._encode_record
+        lines = [encode(record) for record in records]
+        
+        # One O_APPEND write of the concatenated batch: no buffered file object,
+        # and the batch lands contiguously even with other appenders
+        fd = os.open(self.scratchpad_path, _APPEND_FLAGS, 0o644)
+        try:
+            start = os.lseek(fd, 0, os.SEEK_END)
+            buf = memoryview(b''.join(lines))
+            while buf:
+                buf = buf[os.write(fd, buf):]
+            st = os.fstat(fd)
+        finally:
+            os.close(fd)
+        
+        # Someone else appended between refresh and write: let _refresh re-read
+        if start != self._size:
+            return
+        
+        offset = start
+        for record, line in zip(records, lines):
+            self._add_record(record, offset)
+            offset += len(line)
+        self._size = st.st_size
+        self._mtime = st.st_mtime
+        
+        if self._unsaved >= _CACHE_FLUSH_EVERY:
+            self._save_cache()
     
     def get_by_conversation(
         self,
@@ -64,31 +357,25 @@ class MemoryScratchpad:
         Returns:
             List of memory entries
         """
-        entries = []
-        
-        with open(self.scratchpad_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                if not line.strip():
-                    continue
-                
-                try:
-                    data = json.loads(line)
-                    if data.get('conversation_id') == conversation_id:
-                        # Parse timestamp
-                        data['timestamp'] = datetime.fromisoformat(data['timestamp'])
-                        entry = MemoryEntry(**data)
-                        entries.append(entry)
-                except Exception as e:
-                    print(f"Warning: Failed to parse scratchpad entry: {e}")
-        
-        # Sort by timestamp (newest last)
-        entries.sort(key=lambda e: e.timestamp)
-        
-        # Apply limit (most recent)
-        if limit and len(entries) > limit:
-            entries = entries[-limit:]
-        
-        return entries
+        with self._lock:
+            self._refresh()
+            positions = self._by_conv.get(conversation_id, [])
+            
+            if self._in_order:
+                # File order is timestamp order: the most recent are the tail, O(limit)
+                if limit:
+                    positions = positions[-limit:]
+                return [self._to_entry(self._entries[i]) for i in positions]
+            
+            # Sort by timestamp (newest last)
+            records = [self._entries[i] for i in positions]
+            records.sort(key=_by_timestamp)
+            
+            # Apply limit (most recent)
+            if limit and len(records) > limit:
+                records = records[-limit:]
+            
+            return [self._to_entry(r) for r in records]
     
     def get_recent(self, limit: int = 100) -> List[MemoryEntry]:
         """
@@ -100,24 +387,15 @@ class MemoryScratchpad:
         Returns:
             List of memory entries
         """
-        entries = []
-        
-        with open(self.scratchpad_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                if not line.strip():
-                    continue
-                
-                try:
-                    data = json.loads(line)
-                    data['timestamp'] = datetime.fromisoformat(data['timestamp'])
-                    entry = MemoryEntry(**data)
-                    entries.append(entry)
-                except Exception as e:
-                    print(f"Warning: Failed to parse scratchpad entry: {e}")
-        
-        # Sort by timestamp and take most recent
-        entries.sort(key=lambda e: e.timestamp, reverse=True)
-        return entries[:limit]
+        with self._lock:
+            self._refresh()
+            
+            if self._in_order:
+                # Entries were appended chronologically: the newest are the tail
+                records = self._entries[-limit:][::-1] if limit > 0 else []
+            else:
+                records = heapq.nlargest(limit, self._entries, key=_by_timestamp)
+            return [self._to_entry(r) for r in records]
     
     def search_content(
         self,
@@ -136,33 +414,23 @@ class MemoryScratchpad:
         Returns:
             List of matching memory entries
         """
-        query_lower = query.lower()
-        matches = []
-        
-        with open(self.scratchpad_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                if not line.strip():
-                    continue
-                
-                try:
-                    data = json.loads(line)
-                    
-                    # Filter by conversation if specified
-                    if conversation_id and data.get('conversation_id') != conversation_id:
-                        continue
-                    
-                    # Check if query appears in content
-                    content = data.get('content', '').lower()
-                    if query_lower in content:
-                        data['timestamp'] = datetime.fromisoformat(data['timestamp'])
-                        entry = MemoryEntry(**data)
-                        matches.append(entry)
-                except Exception as e:
-                    print(f"Warning: Failed to parse scratchpad entry: {e}")
-        
-        # Sort by timestamp (most recent first)
-        matches.sort(key=lambda e: e.timestamp, reverse=True)
-        return matches[:limit]
+        with self._lock:
+            # Case-insensitive literal match without lowercasing a copy of every content
+            search = re.compile(re.escape(query), re.IGNORECASE).search
+            self._refresh()
+            
+            # Filter by conversation if specified
+            if conversation_id:
+                candidates = [self._entries[i] for i in self._by_conv.get(conversation_id, ())]
+            else:
+                candidates = self._entries
+            
+            # Check if query appears in content
+            matches = [r for r in candidates if search(r['content'])]
+            
+            # Most recent first; only the top `limit` need ordering
+            matches = heapq.nlargest(limit, matches, key=_by_timestamp)
+            return [self._to_entry(r) for r in matches]
     
     def clear_conversation(self, conversation_id: str):
         """
@@ -171,45 +439,58 @@ class MemoryScratchpad:
         Args:
             conversation_id: Conversation to clear
         """
-        # Read all entries
-        entries = []
-        with open(self.scratchpad_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                if not line.strip():
+        with self._lock:
+            self._refresh()
+            positions = self._by_conv.get(conversation_id)
+            if not positions:
+                return
+            
+            # Rewrite file without the conversation: copy the byte ranges between
+            # its known line offsets instead of re-parsing every line
+            removed = {}
+            tmp_path = self.scratchpad_path.with_name(self.scratchpad_path.name + '.tmp')
+            with open(self.scratchpad_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                end = os.fstat(src.fileno()).st_size
+                pos = 0
+                for i in positions:
+                    offset = self._offsets[i]
+                    _copy_range(src, dst, pos, offset - pos)
+                    src.seek(offset)
+                    removed[i] = len(src.readline())
+                    pos = offset + removed[i]
+                _copy_range(src, dst, pos, end - pos)
+            os.replace(tmp_path, self.scratchpad_path)
+            
+            # Drop the conversation from the index and shift the offsets that follow it
+            entries, offsets, by_conv = [], [], {}
+            shift = 0
+            type_counts = self._type_counts
+            for i, (record, offset) in enumerate(zip(self._entries, self._offsets)):
+                if i in removed:
+                    shift += removed[i]
+                    type_counts[record['entry_type']] -= 1
+                    if not type_counts[record['entry_type']]:
+                        del type_counts[record['entry_type']]
                     continue
-                try:
-                    data = json.loads(line)
-                    if data.get('conversation_id') != conversation_id:
-                        entries.append(line)
-                except Exception:
-                    entries.append(line)  # Keep unparseable lines
-        
-        # Rewrite file without the conversation
-        with open(self.scratchpad_path, 'w', encoding='utf-8') as f:
-            f.writelines(entries)
+                by_conv.setdefault(record['conversation_id'], []).append(len(entries))
+                entries.append(record)
+                offsets.append(offset - shift)
+            
+            st = self.scratchpad_path.stat()
+            self._entries, self._offsets, self._by_conv = entries, offsets, by_conv
+            self._size = st.st_size
+            self._mtime = st.st_mtime
+            self._save_cache()
     
     def get_stats(self) -> dict:
         """Get statistics about the scratchpad."""
-        total = 0
-        conversations = set()
-        entry_types = {}
-        
-        with open(self.scratchpad_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                if not line.strip():
-                    continue
-                total += 1
-                try:
-                    data = json.loads(line)
-                    conversations.add(data.get('conversation_id', 'unknown'))
-                    entry_type = data.get('entry_type', 'unknown')
-                    entry_types[entry_type] = entry_types.get(entry_type, 0) + 1
-                except Exception:
-                    pass
-        
-        return {
-            'total_entries': total,
-            'unique_conversations': len(conversations),
-            'entry_types': entry_types
-        }
+        with self._lock:
+            # Only a stat() unless the file changed; counters are maintained on write
+            self._refresh()
+            
+            return {
+                'total_entries': len(self._entries),
+                'unique_conversations': len(self._by_conv),
+                'entry_types': dict(self._type_counts)
+            }
 
@@ -0,0 +1,151 @@
+"""
+Semantic cache for retrieval results.
+Reuses results for queries whose embedding is near-identical to a recent query.
+"""
+
+import threading
+import time
+from typing import Any, List, Optional
+
+import numpy as np
+
+
+class _CacheEntry:
+    __slots__ = ("results", "expires_at", "last_access", "conversation_id", "top_k")
+    
+    def __init__(self, results: List[Any], expires_at: float, last_access: float,
+                 conversation_id: Optional[str], top_k: int):
+        self.results = results
+        self.expires_at = expires_at
+        self.last_access = last_access
+        self.conversation_id = conversation_id
+        self.top_k = top_k
+
+
+class SemanticQueryCache:
+    """LRU + TTL cache keyed by query-embedding cosine similarity."""
+    
+    def __init__(self, max_size: int = 2000, ttl_seconds: float = 300.0, threshold: float = 0.92):
+        """
+        Initialize the semantic query cache.
+        
+        Args:
+            max_size: Maximum cached queries (least recently used evicted first)
+            ttl_seconds: Lifetime of a cached result
+            threshold: Minimum cosine similarity for a cache hit
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        
+        self._lock = threading.RLock()
+        # (max_size, d) L2-normalized query vectors, allocated on first put;
+        # slot i of _matrix belongs to _entries[i] (None when the slot is free)
+        self._matrix: Optional[np.ndarray] = None
+        self._entries: List[Optional[_CacheEntry]] = []
+        self._free: List[int] = []
+        self._size = 0
+    
+    def get(self, query_vector: np.ndarray, conversation_id: Optional[str], top_k: int) -> Optional[List[Any]]:
+        """
+        Look up results cached for a semantically equivalent query.
+        
+        Args:
+            query_vector: L2-normalized query embedding
+            conversation_id: Conversation the results were filtered for
+            top_k: Number of results requested
+        
+        Returns:
+            Cached results, or None on a miss
+        """
+        with self._lock:
+            if not self._size:
+                return None
+            
+            # One matrix-vector product scores every cached query (rows are normalized;
+            # free slots are zeroed so they never clear the threshold)
+            n_filled = len(self._entries)
+            scores = self._matrix[:n_filled] @ np.asarray(query_vector, dtype=np.float32).reshape(-1)
+            best = int(scores.argmax())
+            if scores[best] < self.threshold:
+                return None
+            
+            candidates = np.flatnonzero(scores >= self.threshold)
+            if len(candidates) > 1:
+                candidates = candidates[np.argsort(-scores[candidates])]
+            now = time.monotonic()
+            for slot in candidates:
+                entry = self._entries[slot]
+                if (entry is not None
+                        and entry.expires_at > now
+                        and entry.conversation_id == conversation_id
+                        and entry.top_k == top_k):
+                    entry.last_access = now
+                    return list(entry.results)
+            return None
+    
+    def put(self, query_vector: np.ndarray, conversation_id: Optional[str], top_k: int, results: List[Any]):
+        """
+        Cache results for a query.
+        
+        Args:
+            query_vector: L2-normalized query embedding
+            conversation_id: Conversation the results were filtered for
+            top_k: Number of results requested
+            results: Retrieval results to cache
+        """
+        with self._lock:
+            vector = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+            if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+                self._matrix = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+                self._entries, self._free, self._size = [], [], 0
+            
+            now = time.monotonic()
+            slot = self._take_slot(now)
+            self._matrix[slot] = vector
+            self._entries[slot] = _CacheEntry(
+                list(results), now + self.ttl_seconds, now, conversation_id, top_k
+            )
+            self._size += 1
+    
+    def drop_conversation(self, conversation_id: Optional[str] = None):
+        """
+        Invalidate results that new documents may change.
+        
+        Args:
+            conversation_id: Conversation to invalidate (unfiltered queries are
+                dropped too); None clears the whole cache
+        """
+        with self._lock:
+            for slot, entry in enumerate(self._entries):
+                if entry is not None and (
+                    conversation_id is None or entry.conversation_id in (conversation_id, None)
+                ):
+                    self._release(slot)
+    
+    def _take_slot(self, now: float) -> int:
+        """Return a free slot, growing into the buffer or evicting when it is full."""
+        if self._free:
+            return self._free.pop()
+        if len(self._entries) < self.max_size:
+            self._entries.append(None)
+            return len(self._entries) - 1
+        
+        # Full: reclaim expired entries, else evict the least recently used one
+        for slot, entry in enumerate(self._entries):
+            if entry.expires_at <= now:
+                self._release(slot)
+        if self._free:
+            return self._free.pop()
+        slot = min(range(len(self._entries)), key=lambda i: self._entries[i].last_access)
+        self._release(slot)
+        return self._free.pop()
+    
+    def _release(self, slot: int):
+        self._entries[slot] = None
+        self._matrix[slot] = 0.0
+        self._free.append(slot)
+        self._size -= 1
+    
+    def __len__(self) -> int:
+        return self._size
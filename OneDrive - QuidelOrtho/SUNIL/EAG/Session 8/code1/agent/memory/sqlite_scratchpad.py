@@ -0,0 +1,259 @@
+"""
+Long-term memory scratchpad stored in SQLite.
+Same interface as the JSONL scratchpad, backed by indexed tables and FTS5.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional
+from datetime import datetime
+from ..models import MemoryEntry
+from .scratchpad import _json_loads
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memory (
+    entry_id TEXT PRIMARY KEY,
+    conversation_id TEXT NOT NULL,
+    entry_type TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    meta TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_conv ON memory(conversation_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_ts ON memory(timestamp);
+"""
+
+# Trigram tokens keep search_content a case-insensitive substring match
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts USING fts5(
+    content, content='memory', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS memory_ai AFTER INSERT ON memory BEGIN
+    INSERT INTO memory_fts(rowid, content) VALUES (new.rowid, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS memory_ad AFTER DELETE ON memory BEGIN
+    INSERT INTO memory_fts(memory_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+END;
+"""
+
+_COLUMNS = "entry_id, conversation_id, content, entry_type, timestamp, meta"
+_INSERT = f"INSERT OR REPLACE INTO memory ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)"
+
+
+class SQLiteMemoryScratchpad:
+    """SQLite-based long-term memory storage."""
+    
+    def __init__(
+        self,
+        db_path: str = "./data/memory_scratchpad.db",
+        import_jsonl: Optional[str] = None
+    ):
+        """
+        Initialize SQLite memory scratchpad.
+        
+        Args:
+            db_path: Path to the SQLite database
+            import_jsonl: JSONL scratchpad to import when the database is first
+                created (defaults to the .jsonl file next to db_path)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # REPLACE must fire the delete trigger so the FTS index drops the old row
+        self._conn.execute("PRAGMA recursive_triggers=ON")
+        
+        is_new = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='memory'"
+        ).fetchone() is None
+        
+        self._conn.executescript(_SCHEMA)
+        try:
+            self._conn.executescript(_FTS_SCHEMA)
+            self._has_fts = True
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5/trigram: fall back to LIKE scans
+            logger.warning("FTS5 unavailable for scratchpad search: %s", e)
+            self._has_fts = False
+        
+        if is_new:
+            jsonl_path = Path(import_jsonl) if import_jsonl else self.db_path.with_suffix('.jsonl')
+            if jsonl_path.exists():
+                self._import_jsonl(jsonl_path)
+    
+    def _import_jsonl(self, jsonl_path: Path):
+        """One-time bulk import of an existing JSONL scratchpad."""
+        entries = []
+        errors = 0
+        for line in jsonl_path.read_bytes().split(b'\n'):
+            if not line.strip():
+                continue
+            try:
+                data = _json_loads(line)
+                data['timestamp'] = datetime.fromisoformat(data['timestamp'])
+                entries.append(MemoryEntry(**data))
+            except Exception:
+                errors += 1
+        
+        self.append_batch(entries)
+        if errors:
+            logger.warning("Skipped %d unparseable entries importing %s", errors, jsonl_path)
+        logger.info("Imported %d scratchpad entries from %s", len(entries), jsonl_path)
+    
+    @staticmethod
+    def _to_row(entry: MemoryEntry) -> tuple:
+        return (
+            entry.entry_id,
+            entry.conversation_id,
+            entry.content,
+            entry.entry_type,
+            entry.timestamp.timestamp(),
+            json.dumps(entry.meta),
+        )
+    
+    @staticmethod
+    def _from_row(row: tuple) -> MemoryEntry:
+        entry_id, conversation_id, content, entry_type, timestamp, meta = row
+        # Rows were written from validated entries; skip re-validation on read
+        return MemoryEntry.model_construct(
+            entry_id=entry_id,
+            conversation_id=conversation_id,
+            content=content,
+            entry_type=entry_type,
+            timestamp=datetime.fromtimestamp(timestamp),
+            meta=_json_loads(meta)
+        )
+    
+    def _query(self, sql: str, params: tuple) -> List[MemoryEntry]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._from_row(row) for row in rows]
+    
+    def append(self, entry: MemoryEntry):
+        """
+        Append a memory entry to the scratchpad.
+        
+        Args:
+            entry: Memory entry to append
+        """
+        self.append_batch([entry])
+    
+    def append_batch(self, entries: List[MemoryEntry]):
+        """Append multiple entries in a single transaction."""
+        rows = [self._to_row(entry) for entry in entries]
+        with self._lock, self._conn:
+            self._conn.executemany(_INSERT, rows)
+    
+    def get_by_conversation(
+        self,
+        conversation_id: str,
+        limit: Optional[int] = None
+    ) -> List[MemoryEntry]:
+        """
+        Retrieve entries for a specific conversation.
+        
+        Args:
+            conversation_id: Conversation identifier
+            limit: Maximum number of entries (most recent if limited)
+        
+        Returns:
+            List of memory entries, oldest first
+        """
+        entries = self._query(
+            f"SELECT {_COLUMNS} FROM memory WHERE conversation_id = ? "
+            "ORDER BY timestamp DESC LIMIT ?",
+            (conversation_id, limit or -1)
+        )
+        entries.reverse()
+        return entries
+    
+    def get_recent(self, limit: int = 100) -> List[MemoryEntry]:
+        """
+        Get most recent entries across all conversations.
+        
+        Args:
+            limit: Number of recent entries to return
+        
+        Returns:
+            List of memory entries
+        """
+        return self._query(
+            f"SELECT {_COLUMNS} FROM memory ORDER BY timestamp DESC LIMIT ?",
+            (limit,)
+        )
+    
+    def search_content(
+        self,
+        query: str,
+        conversation_id: Optional[str] = None,
+        limit: int = 10
+    ) -> List[MemoryEntry]:
+        """
+        Case-insensitive substring search in scratchpad content.
+        
+        Args:
+            query: Search query
+            conversation_id: Optional conversation filter
+            limit: Maximum results
+        
+        Returns:
+            List of matching memory entries, most recent first
+        """
+        conv_clause = " AND conversation_id = ?" if conversation_id else ""
+        conv_params = (conversation_id,) if conversation_id else ()
+        
+        if self._has_fts and len(query) >= 3:
+            # Trigram FTS needs at least three characters; quote it as one phrase
+            phrase = '"' + query.replace('"', '""') + '"'
+            sql = (
+                f"SELECT {_COLUMNS} FROM memory WHERE rowid IN "
+                f"(SELECT rowid FROM memory_fts WHERE memory_fts MATCH ?){conv_clause} "
+                "ORDER BY timestamp DESC LIMIT ?"
+            )
+            return self._query(sql, (phrase, *conv_params, limit))
+        
+        pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        sql = (
+            f"SELECT {_COLUMNS} FROM memory WHERE content LIKE ? ESCAPE '\\'{conv_clause} "
+            "ORDER BY timestamp DESC LIMIT ?"
+        )
+        return self._query(sql, (pattern, *conv_params, limit))
+    
+    def clear_conversation(self, conversation_id: str):
+        """
+        Remove all entries for a conversation.
+        
+        Args:
+            conversation_id: Conversation to clear
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM memory WHERE conversation_id = ?", (conversation_id,))
+    
+    def get_stats(self) -> dict:
+        """Get statistics about the scratchpad."""
+        with self._lock:
+            total, conversations = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT conversation_id) FROM memory"
+            ).fetchone()
+            entry_types = dict(self._conn.execute(
+                "SELECT entry_type, COUNT(*) FROM memory GROUP BY entry_type"
+            ).fetchall())
+        
+        return {
+            'total_entries': total,
+            'unique_conversations': conversations,
+            'entry_types': entry_types
+        }
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -3,34 +3,80 @@ FAISS-based vector store for semantic search.
 Stores L2-normalized embeddings with metadata.
 """
 
+import asyncio
+import logging
 import os
 import pickle
+import threading
+from itertools import islice
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 import numpy as np
 import faiss
 from ..models import EmbeddingRecord, Segment, RetrievalQuery, RetrievalResult
 
+logger = logging.getLogger(__name__)
+
+# Brute-force scan below this many vectors; "auto"/"ivfpq" stores rebuild past it
+_PROMOTE_AT = 50_000
+_HNSW_M = 32
+_HNSW_EF_CONSTRUCTION = 200
+_HNSW_EF_SEARCH = 64
+_IVF_TRAIN_SIZE = 10_000
+_IVF_NPROBE = 16
+_INDEX_TYPES = ("auto", "flat", "hnsw", "ivfpq")
+# search_async coalesces queries arriving within this window into one index.search
+_BATCH_WINDOW_S = 0.002
+_BATCH_MAX = 32
+# Metadata is stored column-wise: one list per field, indexed by FAISS id.
+# Segment fields stay None for records added without a segment.
+_COLUMNS = ("doc_id", "segment_id", "meta", "timestamp", "text", "topic_label", "images")
+# (start_word, end_word) rows live in an int32 array grown in chunks of this many rows
+_WORD_RANGE_CHUNK = 10_000
+# Row masks kept for this many distinct filter dicts (least recently used dropped)
+_FILTER_CACHE_SIZE = 64
+
 
 class FAISSVectorStore:
     """FAISS vector store for semantic retrieval."""
     
-    def __init__(self, index_path: str = "./data/faiss_index", dimension: int = 768):
+    def __init__(
+        self,
+        index_path: str = "./data/faiss_index",
+        dimension: int = 768,
+        index_type: str = "auto"
+    ):
         """
         Initialize FAISS vector store.
         
         Args:
             index_path: Path to store/load FAISS index
             dimension: Embedding dimension (768 for Nomic)
+            index_type: "flat" (brute force over fp16 vectors), "hnsw", "ivfpq" (flat
+                until enough vectors to train on), or "auto" (flat, promoted to HNSW
+                past 50k vectors)
         """
+        if index_type not in _INDEX_TYPES:
+            raise ValueError(f"Unknown index_type {index_type!r}; expected one of {_INDEX_TYPES}")
+        
         self.index_path = Path(index_path)
         self.index_path.mkdir(parents=True, exist_ok=True)
         
         self.dimension = dimension
+        self.index_type = index_type
         self.index = None
-        self.metadata: Dict[int, Dict[str, Any]] = {}  # idx -> metadata
+        self.columns: Dict[str, List[Any]] = self._empty_columns()  # field -> [value per idx]
+        self.word_ranges = np.zeros((0, 2), dtype=np.int32)  # idx -> (start_word, end_word)
+        self._filter_masks: Dict[tuple, np.ndarray] = {}  # frozen filters -> bool mask per idx
         self.segment_map: Dict[str, int] = {}  # segment_id -> idx
         
+        # Micro-batching state for search_async (bound to the running event loop)
+        self._query_queue: Optional[asyncio.Queue] = None
+        self._batch_task: Optional[asyncio.Task] = None
+        # search_async runs index.search in a worker thread; adds and promotion
+        # must not mutate (or replace) the index underneath it
+        self._index_lock = threading.Lock()
+        
         self._initialize_index()
     
     def _initialize_index(self):
@@ -43,58 +89,178 @@ class FAISSVectorStore:
             self.index = faiss.read_index(str(index_file))
             with open(metadata_file, 'rb') as f:
                 data = pickle.load(f)
-                self.metadata = data['metadata']
                 self.segment_map = data['segment_map']
-            print(f"Loaded FAISS index with {self.index.ntotal} vectors")
+            if 'word_ranges' in data:
+                self.columns = data['columns']
+                self.word_ranges = data['word_ranges']
+            else:
+                # Older layouts: per-vector dicts, or columns with "start-end" strings
+                columns = data.get('columns') or self._columns_from_rows(data['metadata'], self.index.ntotal)
+                self.word_ranges = self._parse_word_ranges(columns.pop('word_range'))
+                self.columns = columns
+            logger.info("Loaded FAISS index with %d vectors", self.index.ntotal)
+            
+            if self.index.metric_type != faiss.METRIC_INNER_PRODUCT or isinstance(self.index, faiss.IndexFlat):
+                self._migrate_index()
+            else:
+                self._configure_search(self.index)
+                self._maybe_promote()
+        else:
+            self.index = self._new_index()
+            logger.info("Created new FAISS index")
+    
+    @staticmethod
+    def _empty_columns() -> Dict[str, List[Any]]:
+        return {name: [] for name in _COLUMNS}
+    
+    @classmethod
+    def _columns_from_rows(cls, metadata: Dict[int, Dict[str, Any]], ntotal: int) -> Dict[str, List[Any]]:
+        """Convert the older idx -> dict metadata layout into columns."""
+        columns = cls._empty_columns()
+        columns['word_range'] = []
+        for idx in range(ntotal):
+            row = metadata.get(idx, {})
+            for name, column in columns.items():
+                column.append(row.get(name))
+        return columns
+    
+    @staticmethod
+    def _parse_word_ranges(values: List[Optional[str]]) -> np.ndarray:
+        """Parse "start-end" strings once into an (N, 2) int32 array."""
+        ranges = np.zeros((len(values), 2), dtype=np.int32)
+        for idx, value in enumerate(values):
+            if value:
+                start, end = value.split('-')
+                ranges[idx] = (int(start), int(end))
+        return ranges
+    
+    def _target_kind(self, ntotal: int) -> str:
+        """Index structure this store should use at `ntotal` vectors."""
+        if self.index_type in ("flat", "hnsw"):
+            return self.index_type
+        if ntotal <= _PROMOTE_AT:
+            return "flat"
+        return "hnsw" if self.index_type == "auto" else "ivfpq"
+    
+    def _new_index(self):
+        """Create an empty index (inner product on normalized vectors = cosine similarity)."""
+        return self._build_index(self._target_kind(0))
+    
+    def _build_index(self, kind: str, vectors: Optional[np.ndarray] = None):
+        """Build an inner-product index of the given kind, optionally filled with vectors."""
+        if kind == "hnsw":
+            index = faiss.IndexHNSWFlat(self.dimension, _HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = _HNSW_EF_CONSTRUCTION
+        elif kind == "ivfpq":
+            nlist = max(1, int(np.sqrt(len(vectors))))
+            # ~d/8 sub-quantizers; PQ needs the count to divide the dimension
+            m = next(m for m in range(max(1, self.dimension // 8), 0, -1) if self.dimension % m == 0)
+            quantizer = faiss.IndexFlatIP(self.dimension)
+            index = faiss.IndexIVFPQ(quantizer, self.dimension, nlist, m, 8, faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors[:_IVF_TRAIN_SIZE])
         else:
-            # Create new index (L2 distance, since vectors are normalized, this is cosine similarity)
-            self.index = faiss.IndexFlatL2(self.dimension)
-            print("Created new FAISS index")
+            # Vectors are kept as fp16 and widened per query: half the bytes per scan
+            index = faiss.IndexScalarQuantizer(
+                self.dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+            )
+        
+        self._configure_search(index)
+        if vectors is not None and len(vectors):
+            index.add(vectors)
+        return index
+    
+    @staticmethod
+    def _configure_search(index):
+        """Apply query-time parameters (not all of them survive write_index)."""
+        if isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = _HNSW_EF_SEARCH
+        elif isinstance(index, faiss.IndexIVF):
+            index.nprobe = _IVF_NPROBE
     
-    def add_embeddings(self, records: List[EmbeddingRecord], segments: List[Segment] = None):
+    def _all_vectors(self) -> np.ndarray:
+        """Reconstruct every stored vector, in index order."""
+        if isinstance(self.index, faiss.IndexIVF):
+            self.index.make_direct_map()
+        return self.index.reconstruct_n(0, self.index.ntotal)
+    
+    def _maybe_promote(self):
+        """Rebuild a flat index as HNSW/IVF-PQ once it outgrows brute-force search."""
+        kind = self._target_kind(self.index.ntotal)
+        if kind == "flat" or not isinstance(self.index, faiss.IndexScalarQuantizer):
+            return
+        self.index = self._build_index(kind, self._all_vectors())
+        logger.info("Promoted FAISS index to %s (%d vectors)", kind, self.index.ntotal)
+    
+    def _migrate_index(self):
+        """Rebuild an index saved in an older layout (L2 metric or fp32 flat)."""
+        vectors = self._all_vectors()
+        self.index = self._build_index(self._target_kind(len(vectors)), vectors)
+        logger.info("Migrated FAISS index to %s (%d vectors)", type(self.index).__name__, self.index.ntotal)
+    
+    def add_embeddings(
+        self,
+        records: List[EmbeddingRecord],
+        segments: List[Segment] = None,
+        vectors: Optional[np.ndarray] = None
+    ):
         """
         Add embedding records to the index.
         
         Args:
             records: Embedding records to add
             segments: Optional corresponding segments for richer metadata
+            vectors: Optional pre-stacked (N, d) array of the records' vectors;
+                used as-is (no copy when already contiguous float32)
         """
         if not records:
             return
         
         # Convert to numpy array
-        vectors = np.array([rec.vector for rec in records], dtype=np.float32)
+        if vectors is None:
+            # Record vectors are float32 arrays: one contiguous copy, no per-float conversion
+            vectors = np.stack([rec.vector for rec in records])
+        else:
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+            if vectors.shape != (len(records), self.dimension):
+                raise ValueError(
+                    f"vectors shape {vectors.shape} does not match {len(records)} records of dimension {self.dimension}"
+                )
         
         # Get starting index
         start_idx = self.index.ntotal
         
         # Add to FAISS
-        self.index.add(vectors)
+        with self._index_lock:
+            self.index.add(vectors)
+            self._maybe_promote()
         
         # Store metadata
+        columns = self.columns
+        columns['doc_id'].extend(record.doc_id for record in records)
+        columns['segment_id'].extend(record.segment_id for record in records)
+        columns['meta'].extend(record.meta for record in records)
+        columns['timestamp'].extend(record.timestamp.isoformat() for record in records)
         for i, record in enumerate(records):
-            idx = start_idx + i
-            self.metadata[idx] = {
-                'doc_id': record.doc_id,
-                'segment_id': record.segment_id,
-                'meta': record.meta,
-                'timestamp': record.timestamp.isoformat()
-            }
-            self.segment_map[record.segment_id] = idx
-        
-        # Add segment data if provided
-        if segments:
-            for i, segment in enumerate(segments):
-                idx = start_idx + i
-                if idx in self.metadata:
-                    self.metadata[idx].update({
-                        'text': segment.text,
-                        'topic_label': segment.topic_label,
-                        'images': segment.images,
-                        'word_range': f"{segment.start_word}-{segment.end_word}"
-                    })
-        
-        print(f"Added {len(records)} embeddings to FAISS index (total: {self.index.ntotal})")
+            self.segment_map[record.segment_id] = start_idx + i
+        
+        # Add segment data if provided (segments[i] describes records[i])
+        paired = list(segments or [])[:len(records)]
+        paired += [None] * (len(records) - len(paired))
+        columns['text'].extend(seg.text if seg else None for seg in paired)
+        columns['topic_label'].extend(seg.topic_label if seg else None for seg in paired)
+        columns['images'].extend(seg.images if seg else None for seg in paired)
+        
+        end_idx = start_idx + len(records)
+        if end_idx > len(self.word_ranges):
+            capacity = -(-end_idx // _WORD_RANGE_CHUNK) * _WORD_RANGE_CHUNK
+            grown = np.zeros((capacity, 2), dtype=np.int32)
+            grown[:start_idx] = self.word_ranges[:start_idx]
+            self.word_ranges = grown
+        self.word_ranges[start_idx:end_idx] = [
+            (seg.start_word, seg.end_word) if seg else (0, 0) for seg in paired
+        ]
+        
+        logger.debug("Added %d embeddings to FAISS index (total: %d)", len(records), self.index.ntotal)
     
     def search(
         self,
@@ -116,45 +282,101 @@ class FAISSVectorStore:
         if self.index.ntotal == 0:
             return []
         
-        # Ensure query is 2D
-        if query_vector.ndim == 1:
-            query_vector = query_vector.reshape(1, -1)
+        # Ensure query is 2D float32 (no copy for embed_query's contiguous float32 output)
+        query_vector = np.ascontiguousarray(query_vector, dtype=np.float32).reshape(1, -1)
         
-        # Search (L2 distance on normalized vectors = 2 * (1 - cosine_similarity))
-        distances, indices = self.index.search(query_vector.astype(np.float32), min(top_k * 2, self.index.ntotal))
+        # Search (inner product on normalized vectors = cosine similarity)
+        scores, indices = self._locked_search(query_vector, min(top_k * 2, self.index.ntotal))
+        return self._to_results(scores[0], indices[0], top_k, filters)
+    
+    async def search_async(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[RetrievalResult]:
+        """
+        Same as search(), but concurrent callers share one batched index.search.
         
-        # Convert to results
+        Args:
+            query_vector: L2-normalized query vector
+            top_k: Number of results to return
+            filters: Optional metadata filters (e.g., {'doc_id': 'abc123'})
+            
+        Returns:
+            List of retrieval results sorted by similarity
+        """
+        if self.index.ntotal == 0:
+            return []
+        
+        loop = asyncio.get_running_loop()
+        if self._batch_task is None or self._batch_task.done() or self._batch_task.get_loop() is not loop:
+            self._query_queue = asyncio.Queue()
+            self._batch_task = loop.create_task(self._batch_worker(self._query_queue))
+        
+        future = loop.create_future()
+        query = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+        self._query_queue.put_nowait((query, top_k, filters, future))
+        return await future
+    
+    async def _batch_worker(self, queue: asyncio.Queue):
+        """Drain queued queries in batches of up to _BATCH_MAX and answer each future."""
+        while True:
+            batch = [await queue.get()]
+            if queue.qsize() < _BATCH_MAX - 1:
+                await asyncio.sleep(_BATCH_WINDOW_S)
+            while len(batch) < _BATCH_MAX and not queue.empty():
+                batch.append(queue.get_nowait())
+            
+            try:
+                # One search for the whole batch at the widest k asked for; each row is
+                # cut back to its own top_k * 2 candidates, as search() would return
+                k = min(max(item[1] for item in batch) * 2, self.index.ntotal)
+                # Off the event loop: FAISS releases the GIL, other conversations keep running
+                scores, indices = await asyncio.to_thread(
+                    self._locked_search, np.vstack([item[0] for item in batch]), k
+                )
+                for row, (_, top_k, filters, future) in enumerate(batch):
+                    if not future.done():
+                        n = top_k * 2
+                        future.set_result(self._to_results(scores[row, :n], indices[row, :n], top_k, filters))
+            except Exception as e:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+    
+    def _locked_search(self, queries: np.ndarray, k: int):
+        with self._index_lock:
+            return self.index.search(queries, k)
+    
+    def _to_results(
+        self,
+        scores: np.ndarray,
+        indices: np.ndarray,
+        top_k: int,
+        filters: Optional[Dict[str, Any]]
+    ) -> List[RetrievalResult]:
+        """Turn one row of FAISS output into filtered retrieval results."""
+        mask = self._filter_mask(filters) if filters else None
         results = []
-        for dist, idx in zip(distances[0], indices[0]):
+        for score, idx in zip(scores, indices):
             if idx == -1:  # FAISS returns -1 for missing results
                 continue
             
-            metadata = self.metadata.get(int(idx))
-            if metadata is None:
+            idx = int(idx)
+            if idx >= len(self.columns['doc_id']):
                 continue
             
             # Apply filters
-            if filters and not self._matches_filters(metadata, filters):
+            if mask is not None:
+                if not mask[idx]:
+                    continue
+            elif filters and not self._matches_filters(idx, filters):
                 continue
             
-            # Convert L2 distance to cosine similarity: sim = 1 - (dist / 2)
-            similarity_score = 1.0 - (float(dist) / 2.0)
-            
-            # Create segment from metadata
-            segment = Segment(
-                doc_id=metadata['doc_id'],
-                segment_id=metadata['segment_id'],
-                text=metadata.get('text', ''),
-                start_word=int(metadata.get('word_range', '0-0').split('-')[0]),
-                end_word=int(metadata.get('word_range', '0-0').split('-')[1]),
-                topic_label=metadata.get('topic_label'),
-                images=metadata.get('images', []),
-                meta=metadata.get('meta', {})
-            )
-            
             result = RetrievalResult(
-                segment=segment,
-                score=similarity_score
+                segment=self._segment_at(idx),
+                score=float(score)
             )
             results.append(result)
             
@@ -163,13 +385,73 @@ class FAISSVectorStore:
         
         return results
     
-    def _matches_filters(self, metadata: Dict[str, Any], filters: Dict[str, Any]) -> bool:
-        """Check if metadata matches all filters."""
+    def _matches_filters(self, idx: int, filters: Dict[str, Any]) -> bool:
+        """Check if the metadata stored at idx matches all filters."""
         for key, value in filters.items():
-            if key not in metadata or metadata[key] != value:
+            column = self.columns.get(key)
+            if column is None or column[idx] is None or column[idx] != value:
                 return False
         return True
     
+    def _filter_mask(self, filters: Dict[str, Any]) -> Optional[np.ndarray]:
+        """
+        Boolean mask over all rows for a filter dict.
+        
+        Computed once per distinct filter and extended only for rows added since,
+        so repeated filters (e.g. per-conversation retrieval) become one array lookup.
+        
+        Args:
+            filters: Metadata filters
+            
+        Returns:
+            Mask indexed by FAISS id, or None if the filter values are unhashable
+        """
+        try:
+            key = tuple(sorted(filters.items()))
+            hash(key)
+        except TypeError:
+            return None
+        
+        n = len(self.columns['doc_id'])
+        mask = self._filter_masks.pop(key, None)  # re-inserted below as most recent
+        if mask is None or len(mask) < n:
+            start = 0 if mask is None else len(mask)
+            tail = np.ones(n - start, dtype=bool)
+            for name, value in key:
+                column = self.columns.get(name)
+                if column is None:
+                    tail[:] = False
+                    break
+                tail &= np.fromiter(
+                    (v is not None and v == value for v in islice(column, start, n)),
+                    dtype=bool,
+                    count=n - start
+                )
+            mask = tail if mask is None else np.concatenate([mask, tail])
+        
+        self._filter_masks[key] = mask
+        if len(self._filter_masks) > _FILTER_CACHE_SIZE:
+            del self._filter_masks[next(iter(self._filter_masks))]
+        return mask
+    
+    def _segment_at(self, idx: int) -> Segment:
+        """Create a segment from the metadata columns at idx."""
+        columns = self.columns
+        text = columns['text'][idx]
+        start_word, end_word = self.word_ranges[idx].tolist()
+        images = columns['images'][idx]
+        meta = columns['meta'][idx]
+        return Segment(
+            doc_id=columns['doc_id'][idx],
+            segment_id=columns['segment_id'][idx],
+            text=text if text is not None else '',
+            start_word=start_word,
+            end_word=end_word,
+            topic_label=columns['topic_label'][idx],
+            images=images if images is not None else [],
+            meta=meta if meta is not None else {}
+        )
+    
     def save(self):
         """Persist index and metadata to disk."""
         index_file = self.index_path / "index.faiss"
@@ -179,11 +461,12 @@ class FAISSVectorStore:
         
         with open(metadata_file, 'wb') as f:
             pickle.dump({
-                'metadata': self.metadata,
+                'columns': self.columns,
+                'word_ranges': self.word_ranges[:len(self.columns['doc_id'])],
                 'segment_map': self.segment_map
-            }, f)
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
         
-        print(f"Saved FAISS index with {self.index.ntotal} vectors to {self.index_path}")
+        logger.debug("Saved FAISS index with %d vectors to %s", self.index.ntotal, self.index_path)
     
     def get_segment_by_id(self, segment_id: str) -> Optional[Segment]:
         """Retrieve a segment by its ID."""
@@ -191,25 +474,18 @@ class FAISSVectorStore:
         if idx is None:
             return None
         
-        metadata = self.metadata.get(idx)
-        if metadata is None:
+        if idx >= len(self.columns['doc_id']):
             return None
         
-        return Segment(
-            doc_id=metadata['doc_id'],
-            segment_id=metadata['segment_id'],
-            text=metadata.get('text', ''),
-            start_word=int(metadata.get('word_range', '0-0').split('-')[0]),
-            end_word=int(metadata.get('word_range', '0-0').split('-')[1]),
-            topic_label=metadata.get('topic_label'),
-            images=metadata.get('images', []),
-            meta=metadata.get('meta', {})
-        )
+        return self._segment_at(idx)
     
     def clear(self):
         """Clear the index and metadata."""
-        self.index = faiss.IndexFlatL2(self.dimension)
-        self.metadata.clear()
+        with self._index_lock:
+            self.index = self._new_index()
+        self.columns = self._empty_columns()
+        self.word_ranges = np.zeros((0, 2), dtype=np.int32)
+        self._filter_masks.clear()
         self.segment_map.clear()
-        print("Cleared FAISS index")
+        logger.info("Cleared FAISS index")
 
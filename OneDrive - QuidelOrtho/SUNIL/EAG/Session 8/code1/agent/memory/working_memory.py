@@ -61,8 +61,8 @@ class WorkingMemoryManager:
         """
         memory = self.get_memory(conversation_id)
         if n is None:
-            return memory.messages
-        return memory.messages[-n:]
+            return list(memory.messages)
+        return memory.recent(n)
     
     def set_blackboard_value(self, conversation_id: str, key: str, value: Any):
         """
@@ -153,7 +153,7 @@ class WorkingMemoryManager:
         
         if memory.messages:
             lines.append("  Recent messages:")
-            for msg in memory.messages[-3:]:
+            for msg in memory.recent(3):
                 lines.append(f"    [{msg.entry_type}] {msg.content[:60]}...")
         
         return "\n".join(lines)
@@ -3,10 +3,13 @@ Pydantic models for data contracts across all layers.
 Provides type safety and validation for the agent system.
 """
 
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any, Literal
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field, field_serializer, field_validator, model_validator
+from typing import List, Optional, Dict, Any, Literal, Deque
+from collections import deque
 from datetime import datetime
 from enum import Enum
+from itertools import islice
 
 
 class SourceKind(str, Enum):
@@ -41,11 +44,23 @@ class Segment(BaseModel):
 
 class EmbeddingRecord(BaseModel):
     """Represents a segment with its vector embedding."""
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
     doc_id: str
     segment_id: str
-    vector: List[float] = Field(..., description="L2-normalized embedding vector")
+    vector: np.ndarray = Field(..., description="L2-normalized float32 embedding vector, shape (dim,)")
     meta: Dict[str, Any] = Field(default_factory=dict)
     timestamp: datetime = Field(default_factory=datetime.now)
+    
+    @field_validator("vector", mode="before")
+    @classmethod
+    def _as_float32(cls, value):
+        """Accept lists or arrays; no copy when already contiguous float32."""
+        return np.ascontiguousarray(value, dtype=np.float32).reshape(-1)
+    
+    @field_serializer("vector", when_used="json")
+    def _vector_to_list(self, vector: np.ndarray) -> List[float]:
+        return vector.tolist()
 
 
 class ImageCaption(BaseModel):
@@ -108,15 +123,24 @@ class MemoryEntry(BaseModel):
 class WorkingMemory(BaseModel):
     """Short-term working memory for the agent (rolling window)."""
     conversation_id: str
-    messages: List[MemoryEntry] = Field(default_factory=list)
+    messages: Deque[MemoryEntry] = Field(default_factory=deque)
     window_size: int = Field(default=10, description="Maximum messages to retain")
     blackboard: Dict[str, Any] = Field(default_factory=dict, description="Shared state between tools")
     
+    @model_validator(mode="after")
+    def _bound_messages(self):
+        """Back messages with a deque capped at window_size (O(1) eviction)."""
+        if self.messages.maxlen != self.window_size:
+            self.messages = deque(self.messages, maxlen=self.window_size)
+        return self
+    
     def add_message(self, entry: MemoryEntry):
         """Add a message and maintain window size."""
         self.messages.append(entry)
-        if len(self.messages) > self.window_size:
-            self.messages = self.messages[-self.window_size:]
+    
+    def recent(self, n: int) -> List[MemoryEntry]:
+        """Return the last n messages (oldest first) without copying the whole window."""
+        return list(islice(self.messages, max(0, len(self.messages) - n), None))
 
 
 class RetrievalQuery(BaseModel):
@@ -142,4 +166,9 @@ class AgentState(BaseModel):
     working_memory: WorkingMemory
     last_activity: datetime = Field(default_factory=datetime.now)
     status: Literal["idle", "processing", "waiting", "error"] = "idle"
+    # Contents of the last three turns' messages, fed to the planner as history
+    recent_contents: Deque[str] = Field(default_factory=lambda: deque(maxlen=3), exclude=True)
+    # Exact-repeat retrieval shortcut: digest of the last query and its results
+    last_query_key: Optional[bytes] = Field(None, exclude=True)
+    last_query_results: List[RetrievalResult] = Field(default_factory=list, exclude=True)
 
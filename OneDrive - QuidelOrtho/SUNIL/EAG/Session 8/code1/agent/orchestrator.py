@@ -5,19 +5,38 @@ Coordinates Perception, Memory, Decision, and Action layers.
 Maintains conversation state and executes multi-step plans.
 """
 
+import os
 import uuid
 import asyncio
-from typing import Optional, Dict, Any
+import hashlib
+import itertools
+from collections import defaultdict
+from itertools import islice
+from typing import Optional, Dict, Any, DefaultDict
 from datetime import datetime
 
 from .models import (
     AgentState, MemoryEntry, ExecutionPlan, RetrievalQuery,
     SourceDoc, SourceKind
 )
-from .memory import MemoryScratchpad, WorkingMemoryManager
+from .memory import MemoryScratchpad, SQLiteMemoryScratchpad, SemanticQueryCache, WorkingMemoryManager
 from .decision import TaskPlanner, ToolSelector
 from .action import ToolExecutor
 
+# Ingestion pipeline: segments per embed batch, records per FAISS add, queue depth
+_EMBED_BATCH = 32
+_STORE_BATCH = 256
+_PIPELINE_DEPTH = 4
+
+# Memory entry ids: one random prefix per process plus a counter. Unique across
+# restarts (entries persist in the scratchpad) without a urandom read per entry.
+_ENTRY_ID_PREFIX = uuid.uuid4().hex
+_entry_seq = itertools.count()
+
+
+def _next_entry_id() -> str:
+    return f"{_ENTRY_ID_PREFIX}-{next(_entry_seq)}"
+
 
 class CursorAgent:
     """
@@ -44,7 +63,7 @@ class CursorAgent:
             planning_model: Model for planning and reasoning
             chunk_size: Word count for semantic chunks
             faiss_index_path: Path to FAISS index
-            scratchpad_path: Path to memory scratchpad
+            scratchpad_path: Path to memory scratchpad (.jsonl, or .db/.sqlite for SQLite)
         """
         # Perception + Memory setup (lazy/optional to avoid heavy deps at startup)
         self.ingestion = None
@@ -58,8 +77,13 @@ class CursorAgent:
             from .memory import FAISSVectorStore
 
             self.ingestion = DocumentIngestion()
-            self.chunker = SemanticChunker(chunk_size=chunk_size, model=planning_model)
             self.embedder = EmbeddingGenerator(model_name=embedding_model)
+            self.chunker = SemanticChunker(
+                chunk_size=chunk_size,
+                model=planning_model,
+                embedder=self.embedder,
+                topic_detector=os.environ.get("CHUNK_TOPIC_DETECTOR", "local")
+            )
             self.vector_store = FAISSVectorStore(index_path=faiss_index_path, dimension=768)
         except Exception as e:
             # Fall back to minimal mode (no embeddings/context retrieval)
@@ -68,8 +92,13 @@ class CursorAgent:
             self.embedder = None
             self.vector_store = None
             # Minimal scratchpad note will be added when first used
-        self.scratchpad = MemoryScratchpad(scratchpad_path=scratchpad_path)
+        if scratchpad_path.endswith(('.db', '.sqlite', '.sqlite3')):
+            self.scratchpad = SQLiteMemoryScratchpad(db_path=scratchpad_path)
+        else:
+            self.scratchpad = MemoryScratchpad(scratchpad_path=scratchpad_path)
         self.working_memory = WorkingMemoryManager(window_size=10)
+        # Near-duplicate queries reuse recent retrieval results instead of hitting FAISS
+        self.retrieval_cache = SemanticQueryCache(max_size=2000, ttl_seconds=300.0, threshold=0.92)
         
         # Decision layer
         self.planner = TaskPlanner(model=planning_model)
@@ -80,6 +109,13 @@ class CursorAgent:
         
         # Agent state
         self.states: Dict[str, AgentState] = {}
+        # Turns within a conversation run in order; different conversations run concurrently
+        self._conv_locks: DefaultDict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        # Scratchpad writes go through one writer task instead of racing from each turn
+        self._scratchpad_queue: Optional[asyncio.Queue] = None
+        self._scratchpad_writer: Optional[asyncio.Task] = None
+        # Bounds blocking work (embedding, planning) handed to worker threads
+        self._thread_slots = asyncio.Semaphore(os.cpu_count() or 4)
     
     def _get_or_create_state(self, conversation_id: str) -> AgentState:
         """Get or create agent state for a conversation."""
@@ -92,6 +128,36 @@ class CursorAgent:
             )
         return self.states[conversation_id]
     
+    async def _run_blocking(self, func, *args, **kwargs):
+        """Run a blocking call in a worker thread, at most one per CPU at a time."""
+        async with self._thread_slots:
+            return await asyncio.to_thread(func, *args, **kwargs)
+    
+    def _log_to_scratchpad(self, *entries: MemoryEntry):
+        """Queue entries for the scratchpad writer task (started on first use)."""
+        if self._scratchpad_writer is None or self._scratchpad_writer.done():
+            self._scratchpad_queue = asyncio.Queue()
+            self._scratchpad_writer = asyncio.ensure_future(
+                self._scratchpad_writer_loop(self._scratchpad_queue)
+            )
+        self._scratchpad_queue.put_nowait(entries)
+    
+    async def _scratchpad_writer_loop(self, queue: asyncio.Queue):
+        """Drain queued entries into the scratchpad, one batch per write."""
+        try:
+            while True:
+                entries = list(await queue.get())
+                while not queue.empty():
+                    entries.extend(queue.get_nowait())
+                await asyncio.to_thread(self.scratchpad.append_batch, entries)
+        finally:
+            # Loop shutdown cancels this task; don't drop what is still queued
+            entries = []
+            while not queue.empty():
+                entries.extend(queue.get_nowait())
+            if entries:
+                self.scratchpad.append_batch(entries)
+    
     async def process_message(
         self,
         user_message: str,
@@ -111,57 +177,68 @@ class CursorAgent:
             conversation_id = str(uuid.uuid4())
         
         state = self._get_or_create_state(conversation_id)
-        state.status = "processing"
-        state.last_activity = datetime.now()
-        
-        # Add user message to memory
-        user_entry = MemoryEntry(
-            entry_id=str(uuid.uuid4()),
-            conversation_id=conversation_id,
-            content=user_message,
-            entry_type="user_message"
-        )
-        self.working_memory.add_message(conversation_id, user_entry)
-        self.scratchpad.append(user_entry)
-        
-        # Retrieve relevant context from FAISS
-        context = await self._retrieve_context(user_message, conversation_id)
-        
-        # Extract goal and create plan
-        state.current_goal = user_message
-        
-        context_dict = {
-            "conversation_history": [e.content for e in state.working_memory.messages[-3:]],
-            "retrieved_context": [c.segment.text[:200] for c in context[:2]]
-        }
-        
-        plan = self.planner.create_plan(user_message, context=context_dict)
-        state.active_plan = plan
-        
-        # Execute plan
-        blackboard = self.working_memory.get_blackboard(conversation_id)
-        success, blackboard = await self.executor.execute_plan(plan, blackboard)
-        
-        # Update blackboard
-        self.working_memory.update_blackboard(conversation_id, blackboard)
-        
-        # Generate response
-        if success:
-            response = self._generate_success_response(plan, blackboard)
-        else:
-            response = self._generate_error_response(plan)
-        
-        # Add agent response to memory
-        agent_entry = MemoryEntry(
-            entry_id=str(uuid.uuid4()),
-            conversation_id=conversation_id,
-            content=response,
-            entry_type="agent_response"
-        )
-        self.working_memory.add_message(conversation_id, agent_entry)
-        self.scratchpad.append(agent_entry)
         
-        state.status = "idle"
+        async with self._conv_locks[conversation_id]:
+            state.status = "processing"
+            state.last_activity = datetime.now()
+            
+            # Add user message to memory
+            user_entry = MemoryEntry(
+                entry_id=_next_entry_id(),
+                conversation_id=conversation_id,
+                content=user_message,
+                entry_type="user_message"
+            )
+            self.working_memory.add_message(conversation_id, user_entry)
+            state.recent_contents.append(user_message)
+            
+            try:
+                # Retrieve relevant context from FAISS
+                context = await self._retrieve_context(user_message, conversation_id)
+                
+                # Extract goal and create plan
+                state.current_goal = user_message
+                
+                context_dict = {
+                    "conversation_history": list(state.recent_contents),
+                    "retrieved_context": [c.segment.text[:200] for c in islice(context, 2)]
+                }
+                
+                # Planning may block on an LLM call; keep other conversations moving
+                plan = await self._run_blocking(self.planner.create_plan, user_message, context=context_dict)
+                state.active_plan = plan
+                
+                # Execute plan
+                blackboard = self.working_memory.get_blackboard(conversation_id)
+                success, blackboard = await self.executor.execute_plan(plan, blackboard)
+            except BaseException:
+                # The turn failed; still record what the user said
+                self._log_to_scratchpad(user_entry)
+                raise
+            
+            # Update blackboard
+            self.working_memory.update_blackboard(conversation_id, blackboard)
+            
+            # Generate response
+            if success:
+                response = self._generate_success_response(plan, blackboard)
+            else:
+                response = self._generate_error_response(plan)
+            
+            # Add agent response to memory
+            agent_entry = MemoryEntry(
+                entry_id=_next_entry_id(),
+                conversation_id=conversation_id,
+                content=response,
+                entry_type="agent_response"
+            )
+            self.working_memory.add_message(conversation_id, agent_entry)
+            state.recent_contents.append(response)
+            
+            # Both sides of the turn go to the scratchpad as one batched write
+            self._log_to_scratchpad(user_entry, agent_entry)
+            
+            state.status = "idle"
         
         return response
     
@@ -174,31 +251,46 @@ class CursorAgent:
         """Retrieve relevant context from FAISS."""
         if not self.embedder or not self.vector_store:
             return []
-        query_vector = self.embedder.embed_query(query)
-        results = self.vector_store.search(
-            query_vector,
-            top_k=top_k,
-            filters={"conversation_id": conversation_id} if conversation_id else None
-        )
+        
+        # A repeated message ("ok", a resend) skips even the embedding pass
+        state = self.states.get(conversation_id)
+        query_key = hashlib.blake2b(f"{top_k}\0{query}".encode(), digest_size=16).digest()
+        if state is not None and state.last_query_key == query_key:
+            return list(state.last_query_results)
+        
+        # The model forward pass would otherwise stall every other conversation
+        query_vector = await self._run_blocking(self.embedder.embed_query, query)
+        results = self.retrieval_cache.get(query_vector, conversation_id, top_k)
+        if results is None:
+            results = await self.vector_store.search_async(
+                query_vector,
+                top_k=top_k,
+                filters={"conversation_id": conversation_id} if conversation_id else None
+            )
+            self.retrieval_cache.put(query_vector, conversation_id, top_k, results)
+        
+        if state is not None:
+            state.last_query_key = query_key
+            state.last_query_results = list(results)
         return results
     
     def _generate_success_response(self, plan: ExecutionPlan, blackboard: Dict[str, Any]) -> str:
         """Generate a response for successful plan execution."""
         lines = [f"✓ Successfully completed: {plan.goal}\n"]
         
-        # Extract key outputs from blackboard
-        if "sheet_url" in blackboard:
-            lines.append(f"📊 Google Sheet: {blackboard['sheet_url']}")
+        # Extract key outputs from blackboard (one lookup each)
+        if (sheet_url := blackboard.get("sheet_url")) is not None:
+            lines.append(f"📊 Google Sheet: {sheet_url}")
         
-        if "share_link" in blackboard:
-            lines.append(f"🔗 Share link: {blackboard['share_link']}")
+        if (share_link := blackboard.get("share_link")) is not None:
+            lines.append(f"🔗 Share link: {share_link}")
         
-        if "email_message_id" in blackboard:
-            lines.append(f"📧 Email sent (ID: {blackboard['email_message_id']})")
+        if (message_id := blackboard.get("email_message_id")) is not None:
+            lines.append(f"📧 Email sent (ID: {message_id})")
         
-        # Add step summary
-        completed_steps = [s for s in plan.steps if s.status == "completed"]
-        lines.append(f"\nCompleted {len(completed_steps)}/{len(plan.steps)} steps.")
+        # Add step summary (counted in one pass, no intermediate list)
+        completed = sum(1 for s in plan.steps if s.status == "completed")
+        lines.append(f"\nCompleted {completed}/{len(plan.steps)} steps.")
         
         return "\n".join(lines)
     
@@ -236,30 +328,76 @@ class CursorAgent:
             raise RuntimeError("Ingestion with embeddings is unavailable in minimal mode.")
         doc, markdown = self.ingestion.ingest_document(uri, kind)
         
-        # Perception: semantic chunking
-        segments = self.chunker.chunk_document(doc, markdown)
-        
-        # Perception: generate embeddings
-        embedding_records = self.embedder.embed_segments(segments)
+        # Perception -> Memory as one pipeline: chunking, embedding and FAISS
+        # adds overlap, with bounded queues for back-pressure
+        segment_queue: asyncio.Queue = asyncio.Queue(maxsize=_PIPELINE_DEPTH)
+        record_queue: asyncio.Queue = asyncio.Queue(maxsize=_PIPELINE_DEPTH)
+        stored = {"segments": 0, "embeddings": 0}
+        
+        async def chunk_producer():
+            # Perception: semantic chunking
+            batch = []
+            async for segment in self.chunker.iter_segments(doc, markdown):
+                batch.append(segment)
+                if len(batch) >= _EMBED_BATCH:
+                    await segment_queue.put(batch)
+                    batch = []
+            if batch:
+                await segment_queue.put(batch)
+            await segment_queue.put(None)
+        
+        async def embed_worker():
+            # Perception: generate embeddings
+            while (segments := await segment_queue.get()) is not None:
+                records = await asyncio.to_thread(self.embedder.embed_segments, segments)
+                await record_queue.put((records, segments))
+            await record_queue.put(None)
+        
+        async def store_worker():
+            # Memory: store in FAISS
+            records, segments = [], []
+            while (item := await record_queue.get()) is not None:
+                records.extend(item[0])
+                segments.extend(item[1])
+                if len(records) >= _STORE_BATCH:
+                    self.vector_store.add_embeddings(records, segments)
+                    stored["segments"] += len(segments)
+                    stored["embeddings"] += len(records)
+                    records, segments = [], []
+            if records:
+                self.vector_store.add_embeddings(records, segments)
+                stored["segments"] += len(segments)
+                stored["embeddings"] += len(records)
+        
+        stages = [asyncio.ensure_future(stage()) for stage in (chunk_producer, embed_worker, store_worker)]
+        try:
+            await asyncio.gather(*stages)
+        except BaseException:
+            # A failed stage would leave the others blocked on their queues
+            for stage in stages:
+                stage.cancel()
+            raise
         
-        # Memory: store in FAISS
-        self.vector_store.add_embeddings(embedding_records, segments)
         self.vector_store.save()
+        self.retrieval_cache.drop_conversation(conversation_id)
+        for state in self.states.values():
+            if conversation_id is None or state.conversation_id == conversation_id:
+                state.last_query_key = None
         
         # Memory: log to scratchpad
         if conversation_id:
             entry = MemoryEntry(
-                entry_id=str(uuid.uuid4()),
+                entry_id=_next_entry_id(),
                 conversation_id=conversation_id,
-                content=f"Ingested document: {uri} (ID: {doc.doc_id}, {len(segments)} segments)",
+                content=f"Ingested document: {uri} (ID: {doc.doc_id}, {stored['segments']} segments)",
                 entry_type="note"
             )
-            self.scratchpad.append(entry)
+            self._log_to_scratchpad(entry)
         
         print(f"✓ Ingested {uri}")
         print(f"  - Document ID: {doc.doc_id}")
-        print(f"  - Segments: {len(segments)}")
-        print(f"  - Embeddings: {len(embedding_records)}")
+        print(f"  - Segments: {stored['segments']}")
+        print(f"  - Embeddings: {stored['embeddings']}")
         
         return doc.doc_id
     
@@ -285,7 +423,7 @@ class CursorAgent:
         state.current_goal = goal
         
         # Create plan
-        plan = self.planner.create_plan(goal)
+        plan = await self._run_blocking(self.planner.create_plan, goal)
         state.active_plan = plan
         
         # Execute
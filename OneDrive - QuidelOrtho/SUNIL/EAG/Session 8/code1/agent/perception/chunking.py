@@ -5,26 +5,57 @@ If a block contains two topics, return only the second topic;
 the first topic is finalized and the second topic is prepended to the next block.
 """
 
+import asyncio
 import re
-from typing import List, Optional, Tuple
+import numpy as np
+from typing import AsyncIterator, List, Optional, Tuple
 from ..models import Segment, SourceDoc
 from google import genai
 
+# Concurrent topic-detection requests per document (Gemini rate limits)
+_TOPIC_CONCURRENCY = 8
+
+# Local detector: a topic shift is the weakest adjacent-sentence similarity below this
+_TOPIC_SHIFT_THRESHOLD = 0.35
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+
+# Per-segment label and image extraction
+_HEADING_MD = re.compile(r'^#+\s+(.+)$', re.MULTILINE)
+_HEADING_HTML = re.compile(r'<h[1-6]>(.+?)</h[1-6]>', re.IGNORECASE)
+_SENTENCE_END = re.compile(r'[.!?]\s+')
+_MD_IMG = re.compile(r'!\[.*?\]\((.*?)\)')
+_HTML_IMG = re.compile(r'<img[^>]+src=["\']([^"\']+)["\']', re.IGNORECASE)
+
 
 class SemanticChunker:
     """Implements the second-topic rule for semantic chunking."""
     
-    def __init__(self, chunk_size: int = 512, model: str = "gemini-2.0-flash-exp"):
+    def __init__(
+        self,
+        chunk_size: int = 512,
+        model: str = "gemini-2.0-flash-exp",
+        embedder=None,
+        topic_detector: str = "local"
+    ):
         """
         Initialize the semantic chunker.
         
         Args:
             chunk_size: Target word count per chunk
             model: Gemini model for topic detection
+            embedder: EmbeddingGenerator whose model scores sentence similarity
+            topic_detector: "local" (sentence-embedding shift) or "gemini";
+                falls back to Gemini when no embedding model is loaded
         """
         self.chunk_size = chunk_size
-        self.client = genai.Client()
         self.model = model
+        self.embedder = embedder
+        self.use_local_topics = (
+            topic_detector == "local"
+            and embedder is not None
+            and embedder.model is not None
+        )
+        self.client = None if self.use_local_topics else genai.Client()
     
     def chunk_document(self, doc: SourceDoc, text: str) -> List[Segment]:
         """
@@ -37,77 +68,139 @@ class SemanticChunker:
         Returns:
             List of semantically coherent segments
         """
+        return asyncio.run(self.chunk_document_async(doc, text))
+    
+    async def chunk_document_async(self, doc: SourceDoc, text: str) -> List[Segment]:
+        """
+        Chunk a document using the second-topic rule.
+        
+        Args:
+            doc: Source document metadata
+            text: Full text content to chunk
+            
+        Returns:
+            List of semantically coherent segments
+        """
+        return [segment async for segment in self.iter_segments(doc, text)]
+    
+    async def iter_segments(self, doc: SourceDoc, text: str) -> AsyncIterator[Segment]:
+        """
+        Yield segments as soon as the second-topic rule finalizes them.
+        
+        Topic detection for all initial blocks runs ahead concurrently; the
+        carry-over pass consumes the results in block order, so downstream
+        stages (embedding, indexing) can start on early segments.
+        
+        Args:
+            doc: Source document metadata
+            text: Full text content to chunk
+            
+        Yields:
+            Semantically coherent segments, in document order
+        """
         # Split into initial word-based blocks
         words = text.split()
         initial_blocks = self._create_initial_blocks(words)
         
-        # Apply second-topic rule
-        segments = []
+        # Apply second-topic rule. Each block's second topic was detected on the
+        # block alone, so it is also a valid split point after the carry-over.
+        # Invariant: carry-over + block is exactly words[word_offset:block_end],
+        # joined by single spaces, so word positions come from the word index
+        # and space counts rather than re-splitting text.
+        segment_count = 0
         carry_over = ""
         word_offset = 0
         
-        for i, block in enumerate(initial_blocks):
+        async for i, second_topic_text in self._second_topics_in_order(initial_blocks):
             # Prepend carry-over from previous block
+            block = initial_blocks[i]
             full_block = carry_over + " " + block if carry_over else block
+            block_end = min((i + 1) * self.chunk_size, len(words))
+            full_words = block_end - word_offset
             
-            # Detect if there's a second topic
-            second_topic_text = self._detect_second_topic(full_block)
+            # Locate the second topic once; text the LLM edited won't be found,
+            # in which case the block is kept whole rather than miscut
+            split_at = full_block.find(second_topic_text.strip()) if second_topic_text else -1
+            if split_at > 0:
+                # Snap to the start of the word the second topic begins in
+                split_at = full_block.rfind(" ", 0, split_at) + 1
             
-            if second_topic_text and second_topic_text.strip():
+            if split_at >= 0 and second_topic_text.strip():
                 # Extract finalized first topic
-                first_topic = full_block.replace(second_topic_text, "").strip()
+                first_topic = full_block[:split_at].strip()
+                first_words = full_block.count(" ", 0, split_at)
                 
                 if first_topic:
                     # Create segment for first topic
-                    first_words = first_topic.split()
-                    segment = Segment(
+                    yield Segment(
                         doc_id=doc.doc_id,
-                        segment_id=f"{doc.doc_id}_seg_{len(segments)}",
+                        segment_id=f"{doc.doc_id}_seg_{segment_count}",
                         text=first_topic,
                         start_word=word_offset,
-                        end_word=word_offset + len(first_words),
+                        end_word=word_offset + first_words,
                         topic_label=self._extract_topic_label(first_topic),
                         images=self._extract_image_refs(first_topic),
                         meta={"block_index": i}
                     )
-                    segments.append(segment)
-                    word_offset += len(first_words)
+                    segment_count += 1
+                    word_offset += first_words
                 
                 # Carry second topic to next block
-                carry_over = second_topic_text.strip()
+                carry_over = full_block[split_at:]
             else:
                 # No second topic; finalize entire block
-                full_words = full_block.split()
-                segment = Segment(
+                yield Segment(
                     doc_id=doc.doc_id,
-                    segment_id=f"{doc.doc_id}_seg_{len(segments)}",
+                    segment_id=f"{doc.doc_id}_seg_{segment_count}",
                     text=full_block,
                     start_word=word_offset,
-                    end_word=word_offset + len(full_words),
+                    end_word=word_offset + full_words,
                     topic_label=self._extract_topic_label(full_block),
                     images=self._extract_image_refs(full_block),
                     meta={"block_index": i}
                 )
-                segments.append(segment)
-                word_offset += len(full_words)
+                segment_count += 1
+                word_offset = block_end
                 carry_over = ""
         
         # Handle any remaining carry-over
-        if carry_over.strip():
-            carry_words = carry_over.split()
-            segment = Segment(
+        if carry_over:
+            yield Segment(
                 doc_id=doc.doc_id,
-                segment_id=f"{doc.doc_id}_seg_{len(segments)}",
+                segment_id=f"{doc.doc_id}_seg_{segment_count}",
                 text=carry_over,
                 start_word=word_offset,
-                end_word=word_offset + len(carry_words),
+                end_word=len(words),
                 topic_label=self._extract_topic_label(carry_over),
                 images=self._extract_image_refs(carry_over),
                 meta={"block_index": len(initial_blocks)}
             )
-            segments.append(segment)
+    
+    async def _second_topics_in_order(
+        self,
+        blocks: List[str]
+    ) -> AsyncIterator[Tuple[int, Optional[str]]]:
+        """Yield (block index, second topic) in block order as detections complete."""
+        if self.use_local_topics:
+            # CPU-bound; keep the model forward passes off the event loop
+            for i, block in enumerate(blocks):
+                yield i, await asyncio.to_thread(self._detect_second_topic_local, block)
+            return
+        
+        semaphore = asyncio.Semaphore(_TOPIC_CONCURRENCY)
         
-        return segments
+        async def detect(block: str) -> Optional[str]:
+            async with semaphore:
+                return await self._detect_second_topic_async(block)
+        
+        # Fire every request up front; later blocks resolve while earlier ones are consumed
+        tasks = [asyncio.ensure_future(detect(block)) for block in blocks]
+        try:
+            for i, task in enumerate(tasks):
+                yield i, await task
+        finally:
+            for task in tasks:
+                task.cancel()
     
     def _create_initial_blocks(self, words: List[str]) -> List[str]:
         """Split words into initial blocks of target size."""
@@ -119,12 +212,62 @@ class SemanticChunker:
     
     def _detect_second_topic(self, block: str) -> Optional[str]:
         """
-        Use Gemini to detect if there's a second topic in the block.
+        Detect if there's a second topic in the block.
         
         Returns:
             The text of the second topic, or None if only one topic exists.
         """
-        prompt = f"""Analyze the following text block. If it contains TWO distinct topics, return ONLY the text of the SECOND topic. If there's only one topic, return an empty string.
+        if self.use_local_topics:
+            return self._detect_second_topic_local(block)
+        
+        try:
+            response = self.client.models.generate_content(
+                model=self.model,
+                contents=self._second_topic_prompt(block)
+            )
+            return self._parse_second_topic(response.text)
+        except Exception as e:
+            print(f"Warning: Topic detection failed: {e}")
+            return None
+    
+    def _detect_second_topic_local(self, block: str) -> Optional[str]:
+        """
+        Find a topic shift as the least similar pair of adjacent sentences.
+        
+        Returns:
+            The text from the shift onward, or None if no pair falls below
+            the similarity threshold.
+        """
+        sentences = _SENTENCE_SPLIT.split(block)
+        if len(sentences) < 2:
+            return None
+        
+        # One batched forward pass; normalized rows make the row-wise dot a cosine
+        emb = self.embedder.model.encode(
+            sentences, batch_size=32, normalize_embeddings=True, convert_to_numpy=True
+        )
+        sims = np.einsum('ij,ij->i', emb[:-1], emb[1:])
+        split_idx = int(sims.argmin())
+        if sims[split_idx] >= _TOPIC_SHIFT_THRESHOLD:
+            return None
+        
+        return " ".join(sentences[split_idx + 1:])
+    
+    async def _detect_second_topic_async(self, block: str) -> Optional[str]:
+        """Async variant of _detect_second_topic using the Gemini aio client."""
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=self.model,
+                contents=self._second_topic_prompt(block)
+            )
+            return self._parse_second_topic(response.text)
+        except Exception as e:
+            print(f"Warning: Topic detection failed: {e}")
+            return None
+    
+    @staticmethod
+    def _second_topic_prompt(block: str) -> str:
+        return f"""Analyze the following text block. If it contains TWO distinct topics, return ONLY the text of the SECOND topic. If there's only one topic, return an empty string.
 
 Text block:
 {block}
@@ -136,51 +279,43 @@ Instructions:
 - Do not add explanations, just return the text or empty string
 
 Second topic text:"""
-
-        try:
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt
-            )
-            result = response.text.strip()
-            
-            # Clean up common LLM response patterns
-            if result.lower() in ["", '""', "none", "n/a", "no second topic"]:
-                return None
-            
-            return result
-        except Exception as e:
-            print(f"Warning: Topic detection failed: {e}")
+    
+    @staticmethod
+    def _parse_second_topic(text: str) -> Optional[str]:
+        result = text.strip()
+        
+        # Clean up common LLM response patterns
+        if result.lower() in ["", '""', "none", "n/a", "no second topic"]:
             return None
+        
+        return result
     
     def _extract_topic_label(self, text: str) -> Optional[str]:
         """Extract a brief topic label from text (first sentence or heading)."""
         # Try to find a heading (markdown or HTML)
-        heading_match = re.search(r'^#+\s+(.+)$', text, re.MULTILINE)
+        heading_match = _HEADING_MD.search(text)
         if heading_match:
             return heading_match.group(1).strip()
         
-        heading_match = re.search(r'<h[1-6]>(.+?)</h[1-6]>', text, re.IGNORECASE)
+        heading_match = _HEADING_HTML.search(text)
         if heading_match:
             return heading_match.group(1).strip()
         
-        # Use first sentence as topic
-        sentences = re.split(r'[.!?]\s+', text)
-        if sentences:
-            return sentences[0][:100]  # First 100 chars of first sentence
-        
-        return None
+        # Use first sentence as topic (only the first boundary is needed, not a full split)
+        sentence_end = _SENTENCE_END.search(text)
+        first_sentence = text[:sentence_end.start()] if sentence_end else text
+        return first_sentence[:100]  # First 100 chars of first sentence
     
     def _extract_image_refs(self, text: str) -> List[str]:
         """Extract image references from markdown or HTML."""
         images = []
         
         # Markdown images: ![alt](url)
-        md_images = re.findall(r'!\[.*?\]\((.*?)\)', text)
+        md_images = _MD_IMG.findall(text)
         images.extend(md_images)
         
         # HTML images: <img src="url">
-        html_images = re.findall(r'<img[^>]+src=["\']([^"\']+)["\']', text, re.IGNORECASE)
+        html_images = _HTML_IMG.findall(text)
         images.extend(html_images)
         
         return images
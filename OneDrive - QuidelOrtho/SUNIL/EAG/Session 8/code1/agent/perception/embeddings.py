@@ -2,9 +2,13 @@
 Embedding generation using Nomic embeddings with L2 normalization.
 """
 
+import hashlib
 import os
 import sys
+import threading
 import warnings
+from collections import OrderedDict
+from pathlib import Path
 
 # Suppress NumPy/PyTorch compatibility warnings BEFORE any imports
 warnings.filterwarnings("ignore", category=UserWarning, message=".*NumPy.*")
@@ -55,32 +59,57 @@ except (ImportError, Exception) as e:
 
 from ..models import Segment, EmbeddingRecord
 
+# Hot embeddings kept in memory in front of the on-disk cache
+_MEMORY_CACHE_SIZE = 4096
+
+# Progress bars only for batches long enough to be worth watching; EMBED_QUIET=1 disables them
+_PROGRESS_MIN_BATCH = 128
+_EMBED_QUIET = os.environ.get("EMBED_QUIET", "").lower() in ("1", "true")
+
 
 class EmbeddingGenerator:
     """Generates L2-normalized embeddings for text segments."""
     
-    def __init__(self, model_name: str = "nomic-ai/nomic-embed-text-v1.5"):
+    def __init__(
+        self,
+        model_name: str = "nomic-ai/nomic-embed-text-v1.5",
+        cache_dir: str = "./data/embeddings"
+    ):
         """
         Initialize the embedding generator.
         
         Args:
             model_name: HuggingFace model identifier
+            cache_dir: Directory for embeddings cached by SHA-256 of the text
         """
         self.model = None
         self.dimension = 768  # Default dimension for nomic-embed-text-v1.5
         self.model_name = model_name
         
+        # One subdirectory per model so a model switch never serves stale vectors
+        self.cache_dir = Path(cache_dir) / model_name.replace("/", "__")
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._memory_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # Queries and ingestion embed from worker threads concurrently
+        self._cache_lock = threading.Lock()
+        
         if not SENTENCE_TRANSFORMERS_AVAILABLE:
             print("Warning: sentence_transformers not available. Embeddings disabled.")
             return
         
         try:
+            # EMBED_DEVICE=cpu forces CPU if the GPU stack misbehaves
+            device = os.environ.get("EMBED_DEVICE") or ("cuda" if torch.cuda.is_available() else "cpu")
+            
             # Try to load the model with timeout handling
             self.model = SentenceTransformer(
                 model_name, 
                 trust_remote_code=True,
-                device='cpu'  # Use CPU to avoid GPU/ML issues
+                device=device
             )
+            if device != "cpu":
+                # FP16 halves memory traffic and uses tensor cores; outputs are cast back to float32
+                self.model = self.model.half()
             self.dimension = self.model.get_sentence_embedding_dimension()
         except Exception as e:
             # If model loading fails (SSL error, network issue, etc.), set to None
@@ -108,6 +137,88 @@ class EmbeddingGenerator:
             
             self.model = None
     
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    
+    def _cache_get(self, key: str) -> Optional[np.ndarray]:
+        with self._cache_lock:
+            vector = self._memory_cache.get(key)
+            if vector is not None:
+                self._memory_cache.move_to_end(key)
+                return vector
+        
+        path = self.cache_dir / f"{key}.npy"
+        try:
+            vector = np.load(path)
+        except (OSError, ValueError):
+            return None
+        self._memory_put(key, vector)
+        return vector
+    
+    def _cache_put(self, key: str, vector: np.ndarray):
+        self._memory_put(key, vector)
+        path = self.cache_dir / f"{key}.npy"
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, vector)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not cache embedding: {e}")
+    
+    def _memory_put(self, key: str, vector: np.ndarray):
+        with self._cache_lock:
+            self._memory_cache[key] = vector
+            self._memory_cache.move_to_end(key)
+            if len(self._memory_cache) > _MEMORY_CACHE_SIZE:
+                self._memory_cache.popitem(last=False)
+    
+    def _embed_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        L2-normalized float32 embeddings, encoding only texts not already cached.
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            Array of shape (len(texts), dimension)
+        """
+        if self.model is None:
+            # Zero vectors if model not available (never cached; nothing to normalize)
+            return np.zeros((len(texts), self.dimension), dtype=np.float32)
+        
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        misses: "OrderedDict[str, List[int]]" = OrderedDict()  # key -> rows (deduplicated)
+        miss_texts = []
+        for i, text in enumerate(texts):
+            key = self._key(text)
+            if key in misses:
+                misses[key].append(i)
+                continue
+            vector = self._cache_get(key)
+            if vector is not None and vector.shape == (self.dimension,):
+                embeddings[i] = vector
+            else:
+                misses[key] = [i]
+                miss_texts.append(text)
+        
+        if miss_texts:
+            # Batch encode the misses only; L2 normalization happens inside encode
+            encoded = self.model.encode(
+                miss_texts,
+                batch_size=64,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=not _EMBED_QUIET and len(miss_texts) > _PROGRESS_MIN_BATCH
+            ).astype(np.float32, copy=False)
+            
+            for (key, rows), vector in zip(misses.items(), encoded):
+                embeddings[rows] = vector
+                self._cache_put(key, vector)
+        
+        return embeddings
+    
     def embed_segment(self, segment: Segment) -> EmbeddingRecord:
         """
         Generate embedding for a single segment.
@@ -118,22 +229,12 @@ class EmbeddingGenerator:
         Returns:
             Embedding record with L2-normalized vector
         """
-        if self.model is None:
-            # Return a zero vector if model not available
-            embedding = np.zeros(self.dimension)
-        else:
-            # Generate embedding
-            embedding = self.model.encode(segment.text, convert_to_numpy=True)
-        
-        # L2 normalize
-        norm = np.linalg.norm(embedding)
-        if norm > 0:
-            embedding = embedding / norm
+        embedding = self._embed_texts([segment.text])[0]
         
         return EmbeddingRecord(
             doc_id=segment.doc_id,
             segment_id=segment.segment_id,
-            vector=embedding.tolist(),
+            vector=embedding,
             meta={
                 "topic_label": segment.topic_label,
                 "word_range": f"{segment.start_word}-{segment.end_word}",
@@ -154,20 +255,7 @@ class EmbeddingGenerator:
         if not segments:
             return []
         
-        if self.model is None:
-            # Return zero vectors if model not available
-            embeddings = np.zeros((len(segments), self.dimension))
-        else:
-            # Extract texts
-            texts = [seg.text for seg in segments]
-            
-            # Batch encode
-            embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=True)
-        
-        # L2 normalize batch
-        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
-        norms[norms == 0] = 1  # Avoid division by zero
-        embeddings = embeddings / norms
+        embeddings = self._embed_texts([seg.text for seg in segments])
         
         # Create records
         records = []
@@ -175,7 +263,7 @@ class EmbeddingGenerator:
             record = EmbeddingRecord(
                 doc_id=segment.doc_id,
                 segment_id=segment.segment_id,
-                vector=embedding.tolist(),
+                vector=embedding,
                 meta={
                     "topic_label": segment.topic_label,
                     "word_range": f"{segment.start_word}-{segment.end_word}",
@@ -194,18 +282,9 @@ class EmbeddingGenerator:
             query_text: Query string
             
         Returns:
-            L2-normalized embedding vector
+            L2-normalized, C-contiguous float32 embedding vector
         """
-        if self.model is None:
-            # Return a zero vector if model not available
-            embedding = np.zeros(self.dimension)
-        else:
-            embedding = self.model.encode(query_text, convert_to_numpy=True)
-        
-        # L2 normalize
-        norm = np.linalg.norm(embedding)
-        if norm > 0:
-            embedding = embedding / norm
-        
-        return embedding
+        # Normalized inside encode and already float32/contiguous, so FAISS and
+        # the query cache use it without re-casting or copying
+        return np.ascontiguousarray(self._embed_texts([query_text])[0])
 
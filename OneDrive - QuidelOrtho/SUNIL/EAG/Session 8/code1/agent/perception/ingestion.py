@@ -7,12 +7,51 @@ and other formats. Funnels everything to clean Markdown.
 
 import os
 import re
-from typing import Tuple, List
+import threading
+from functools import lru_cache
+from typing import Tuple, List, Optional
 from pathlib import Path
 import hashlib
 from ..models import SourceDoc, SourceKind, ImageCaption
 
 
+_IMG_TAG = re.compile(r'<img', re.IGNORECASE)
+
+# Download chunk size and timeout for streamed document fetches
+_DOWNLOAD_CHUNK = 64 * 1024
+_DOWNLOAD_TIMEOUT_S = 30
+
+# Keep-alive HTTP session for document downloads (created on first use)
+_http_session = None
+_HTTP_SESSION_LOCK = threading.Lock()
+
+
+def _get_http_session():
+    """Return the shared requests.Session with pooled connections."""
+    global _http_session
+    with _HTTP_SESSION_LOCK:
+        if _http_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+        return _http_session
+
+
+@lru_cache(maxsize=256)
+def _caption_patterns(image_refs: Tuple[str, ...]) -> Tuple[re.Pattern, re.Pattern]:
+    """Compiled (markdown, HTML) patterns matching any of the image references."""
+    refs = "|".join(re.escape(ref) for ref in image_refs)
+    return (
+        re.compile(rf'!\[.*?\]\(({refs})\)'),
+        re.compile(rf'<img[^>]+src=["\']({refs})["\'][^>]*>', re.IGNORECASE),
+    )
+
+
 class DocumentIngestion:
     """Handles ingestion and conversion of various document types."""
     
@@ -50,7 +89,7 @@ class DocumentIngestion:
         if kind == SourceKind.HTML:
             markdown = self._ingest_html(uri)
         elif kind == SourceKind.PDF:
-            markdown = self._ingest_pdf(uri)
+            markdown = self._ingest_pdf(uri, doc_id)
         elif kind == SourceKind.IMAGE:
             markdown = self._ingest_image(uri)
         elif kind == SourceKind.TEXT:
@@ -122,11 +161,15 @@ class DocumentIngestion:
             print(f"Error ingesting HTML: {e}")
             return f"Error: Could not ingest {uri}"
     
-    def _ingest_pdf(self, uri: str) -> str:
+    def _ingest_pdf(self, uri: str, doc_id: Optional[str] = None) -> str:
         """
         Ingest PDF using MuPDF4LLM.
         
         Note: In production, this would call the MCP mupdf4llm-stdio server.
+        
+        Args:
+            uri: URL or file path
+            doc_id: Document ID already computed for uri (names the temp download)
         """
         try:
             import pymupdf4llm
@@ -135,7 +178,7 @@ class DocumentIngestion:
             if uri.startswith("http"):
                 import requests
                 response = requests.get(uri)
-                temp_path = self.temp_dir / f"temp_{self._generate_doc_id(uri)}.pdf"
+                temp_path = self.temp_dir / f"temp_{doc_id or self._generate_doc_id(uri)}.pdf"
                 temp_path.write_bytes(response.content)
                 pdf_path = str(temp_path)
             else:
@@ -169,9 +212,13 @@ class DocumentIngestion:
         """Ingest plain text file."""
         try:
             if uri.startswith("http"):
-                import requests
-                response = requests.get(uri)
-                return response.text
+                # Stream into one buffer and decode once, instead of holding the
+                # body as bytes and then again as a decoded copy
+                with _get_http_session().get(uri, stream=True, timeout=_DOWNLOAD_TIMEOUT_S) as response:
+                    body = bytearray()
+                    for chunk in response.iter_content(_DOWNLOAD_CHUNK):
+                        body.extend(chunk)
+                    return body.decode(response.encoding or 'utf-8', errors='replace')
             else:
                 with open(uri, 'r', encoding='utf-8') as f:
                     return f.read()
@@ -195,18 +242,46 @@ class DocumentIngestion:
         Returns:
             Enhanced markdown with alt text
         """
+        if not captions:
+            return markdown
+        
+        # The last caption wins for a repeated ref
+        caption_by_ref = {caption.image_ref: caption for caption in captions}
         enhanced = markdown
         
-        for caption in captions:
-            # Replace markdown images
-            pattern = rf'!\[.*?\]\({re.escape(caption.image_ref)}\)'
-            replacement = f'![{caption.alt_text}]({caption.image_ref})'
-            enhanced = re.sub(pattern, replacement, enhanced)
+        # Markdown images: a ref whose every occurrence is the bare ![](ref) form
+        # is swapped with str.replace; only the rest need the regex
+        regex_refs = []
+        for ref, caption in caption_by_ref.items():
+            occurrences = enhanced.count(f']({ref})')
+            if not occurrences:
+                continue
+            bare = f'![]({ref})'
+            if enhanced.count(bare) == occurrences:
+                enhanced = enhanced.replace(bare, f'![{caption.alt_text}]({ref})')
+            else:
+                regex_refs.append(ref)
+        
+        if regex_refs:
+            # One alternation over the remaining refs: a single pass over the text
+            md_pattern, _ = _caption_patterns(tuple(regex_refs))
+            
+            def md_replacement(match: re.Match) -> str:
+                caption = caption_by_ref[match.group(1)]
+                return f'![{caption.alt_text}]({caption.image_ref})'
+            
+            enhanced = md_pattern.sub(md_replacement, enhanced)
+        
+        # HTML images (case-insensitive); skip the pass when there are no <img> tags
+        if _IMG_TAG.search(enhanced):
+            html_caption_by_ref = {ref.lower(): caption for ref, caption in caption_by_ref.items()}
+            _, html_pattern = _caption_patterns(tuple(caption_by_ref))
+            
+            def html_replacement(match: re.Match) -> str:
+                caption = html_caption_by_ref[match.group(1).lower()]
+                return f'<img src="{caption.image_ref}" alt="{caption.alt_text}">'
             
-            # Replace HTML images
-            pattern = rf'<img[^>]+src=["\']({re.escape(caption.image_ref)})["\'][^>]*>'
-            replacement = f'<img src="{caption.image_ref}" alt="{caption.alt_text}">'
-            enhanced = re.sub(pattern, replacement, enhanced, flags=re.IGNORECASE)
+            enhanced = html_pattern.sub(html_replacement, enhanced)
         
         return enhanced
 
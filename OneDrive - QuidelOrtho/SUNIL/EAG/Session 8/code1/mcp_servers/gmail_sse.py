@@ -5,12 +5,13 @@ MCP SSE server for Gmail operations.
 import os
 import sys
 import base64
+import string
+from io import BytesIO
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
-import re
-from typing import Any, Dict, List
+from email.mime.application import MIMEApplication
+from email.generator import BytesGenerator
+from typing import Any, Dict, List, Optional, Tuple
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -26,6 +27,73 @@ except ImportError:
 
 SCOPES = ['https://www.googleapis.com/auth/gmail.send']
 
+# Parsed token files shared by all server instances: token_path -> (mtime, credentials)
+_CRED_CACHE: Dict[str, Tuple[float, Credentials]] = {}
+
+
+def _load_credentials(token_path: str) -> Credentials:
+    """Parse a token file, reusing the previous parse while the file is unchanged."""
+    mtime = os.stat(token_path).st_mtime
+    cached = _CRED_CACHE.get(token_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+    _CRED_CACHE[token_path] = (mtime, creds)
+    return creds
+
+
+def _remember_credentials(token_path: str, creds: Credentials):
+    """Record credentials that were just written to token_path."""
+    _CRED_CACHE[token_path] = (os.stat(token_path).st_mtime, creds)
+
+
+# Characters allowed in the local part and in the domain of an address
+_LOCAL_CHARS = frozenset(string.ascii_letters + string.digits + '._%+-')
+_DOMAIN_CHARS = frozenset(string.ascii_letters + string.digits + '.-')
+_TLD_CHARS = frozenset(string.ascii_letters)
+
+
+def _extract_address(part: str) -> Optional[str]:
+    """
+    Return the first email address embedded in a recipient token, or None.
+    
+    Scans like a leftmost match of local@domain.tld: the local part is the run of
+    allowed characters just before an "@", the domain is cut back to its last
+    ".tld" with at least two letters. Anything around the address ("Name <...>",
+    "mailto:", quotes, trailing punctuation) is ignored.
+    """
+    n = len(part)
+    at = part.find('@')
+    while at != -1:
+        start = at
+        while start and part[start - 1] in _LOCAL_CHARS:
+            start -= 1
+        end = at + 1
+        while end < n and part[end] in _DOMAIN_CHARS:
+            end += 1
+        
+        if start < at:
+            # The host needs at least one character before the dot of the TLD
+            dot = part.rfind('.', at + 2, end)
+            while dot != -1:
+                tld_end = dot + 1
+                while tld_end < end and part[tld_end] in _TLD_CHARS:
+                    tld_end += 1
+                if tld_end - dot > 2:
+                    return part[start:tld_end]
+                dot = part.rfind('.', at + 2, dot)
+        at = part.find('@', at + 1)
+    return None
+
+
+def _encode_raw(message) -> str:
+    """Serialize a MIME message to the URL-safe base64 string the Gmail API expects."""
+    buf = BytesIO()
+    BytesGenerator(buf, mangle_from_=False).flatten(message)
+    # Encode straight from the buffer rather than a bytes copy of it
+    with buf.getbuffer() as view:
+        return base64.urlsafe_b64encode(view).decode('ascii')
+
 
 class GmailSSEServer(SSEMCPServer):
     """SSE MCP server for Gmail operations."""
@@ -36,20 +104,26 @@ class GmailSSEServer(SSEMCPServer):
             "send": self.send
         }
         self.creds = None
+        # Token and client-secret locations, resolved once from the environment
+        self._token_path = os.path.abspath(os.path.expanduser(
+            os.environ.get('GOOGLE_GMAIL_TOKEN_PATH', 'gmail_token.json')
+        ))
+        self._creds_path = os.path.abspath(os.path.expanduser(
+            os.environ.get('GOOGLE_CLIENT_SECRET_PATH', 'credentials.json')
+        ))
+        self._service = None
+        self._service_creds = None
     
     def _get_credentials(self):
         """Get or refresh Google credentials."""
         if self.creds and self.creds.valid:
             return self.creds
         
-        token_path = os.environ.get('GOOGLE_GMAIL_TOKEN_PATH', 'gmail_token.json')
-        creds_path = os.environ.get('GOOGLE_CLIENT_SECRET_PATH', 'credentials.json')
-        
-        token_path = os.path.abspath(os.path.expanduser(token_path))
-        creds_path = os.path.abspath(os.path.expanduser(creds_path))
+        token_path = self._token_path
+        creds_path = self._creds_path
         
         if os.path.exists(token_path):
-            self.creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+            self.creds = _load_credentials(token_path)
         
         if not self.creds or not self.creds.valid:
             if self.creds and self.creds.expired and self.creds.refresh_token:
@@ -61,9 +135,19 @@ class GmailSSEServer(SSEMCPServer):
                 self.creds = flow.run_local_server(port=0)
             with open(token_path, 'w') as token:
                 token.write(self.creds.to_json())
+            _remember_credentials(token_path, self.creds)
         
         return self.creds
     
+    def _get_service(self):
+        """Return the Gmail API client, rebuilt only when the credentials object changes."""
+        creds = self._get_credentials()
+        if self._service is None or self._service_creds is not creds:
+            # Discovery docs ship with googleapiclient; skip the file cache lookup
+            self._service = build('gmail', 'v1', credentials=creds, cache_discovery=False)
+            self._service_creds = creds
+        return self._service
+    
     async def send(
         self,
         to: str,
@@ -73,19 +157,17 @@ class GmailSSEServer(SSEMCPServer):
     ) -> Dict[str, Any]:
         """Send email via Gmail."""
         try:
-            creds = self._get_credentials()
-            service = build('gmail', 'v1', credentials=creds)
+            service = self._get_service()
             
             message = MIMEMultipart()
             
             # Parse recipients
             recipients: List[str] = []
             if isinstance(to, str):
-                parts = [p.strip() for p in re.split(r"[,;\s]+", to) if p and p.strip()]
-                for p in parts:
-                    m = re.search(r"([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,})", p)
-                    if m:
-                        recipients.append(m.group(1))
+                for p in to.replace(',', ' ').replace(';', ' ').split():
+                    address = _extract_address(p)
+                    if address:
+                        recipients.append(address)
             
             recipients = list(dict.fromkeys(recipients))
             if not recipients:
@@ -110,16 +192,15 @@ class GmailSSEServer(SSEMCPServer):
                 for file_path in attachments:
                     if file_path and isinstance(file_path, str) and os.path.exists(file_path):
                         with open(file_path, 'rb') as f:
-                            part = MIMEBase('application', 'octet-stream')
-                            part.set_payload(f.read())
-                            encoders.encode_base64(part)
-                            part.add_header(
-                                'Content-Disposition',
-                                f'attachment; filename={os.path.basename(file_path)}'
-                            )
-                            message.attach(part)
+                            # application/octet-stream, base64-encoded as the payload is set
+                            part = MIMEApplication(f.read())
+                        part.add_header(
+                            'Content-Disposition',
+                            f'attachment; filename={os.path.basename(file_path)}'
+                        )
+                        message.attach(part)
             
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
+            raw_message = _encode_raw(message)
             send_message = service.users().messages().send(
                 userId='me',
                 body={'raw': raw_message}
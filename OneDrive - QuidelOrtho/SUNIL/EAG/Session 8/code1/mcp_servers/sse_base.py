@@ -37,6 +37,7 @@ class SSEMCPServer:
         self.app.router.add_post('/mcp/initialize', self.handle_initialize)
         self.app.router.add_get('/mcp/tools/list', self.handle_tools_list)
         self.app.router.add_post('/mcp/tools/call', self.handle_tools_call)
+        self.app.router.add_post('/mcp/tools/batch', self.handle_tools_batch)
         self.app.router.add_get('/mcp/sse', self.handle_sse)
         self.app.router.add_get('/health', self.handle_health)
     
@@ -76,6 +77,18 @@ class SSEMCPServer:
             logger.error(f"Error in tools/list: {e}")
             return web.json_response({"error": str(e)}, status=500)
     
+    async def _call_tool(self, tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one tool and wrap its result in the MCP content format."""
+        result = await self.tools[tool_name](**args)
+        return {
+            "content": [
+                {
+                    "type": "text",
+                    "text": json.dumps(result)
+                }
+            ]
+        }
+    
     async def handle_tools_call(self, request: web.Request) -> web.Response:
         """Handle tools/call request."""
         try:
@@ -90,21 +103,34 @@ class SSEMCPServer:
                 )
             
             # Call the tool
-            result = await self.tools[tool_name](**args)
-            
-            response = {
-                "content": [
-                    {
-                        "type": "text",
-                        "text": json.dumps(result)
-                    }
-                ]
-            }
+            response = await self._call_tool(tool_name, args)
             return web.json_response(response)
         except Exception as e:
             logger.error(f"Error in tools/call: {e}")
             return web.json_response({"error": str(e)}, status=500)
     
+    async def handle_tools_batch(self, request: web.Request) -> web.Response:
+        """Handle several tools/call requests in one round trip (results keep request order)."""
+        try:
+            data = await request.json()
+            calls = data.get("calls", [])
+            
+            async def run(call: Dict[str, Any]) -> Dict[str, Any]:
+                tool_name = call.get("name")
+                if tool_name not in self.tools:
+                    return {"error": f"Unknown tool: {tool_name}"}
+                try:
+                    return await self._call_tool(tool_name, call.get("arguments", {}))
+                except Exception as e:
+                    logger.error(f"Error in tools/batch ({tool_name}): {e}")
+                    return {"error": str(e)}
+            
+            results = await asyncio.gather(*(run(call) for call in calls))
+            return web.json_response({"results": results})
+        except Exception as e:
+            logger.error(f"Error in tools/batch: {e}")
+            return web.json_response({"error": str(e)}, status=500)
+    
     async def handle_sse(self, request: web.Request) -> web.StreamResponse:
         """Handle SSE connection for real-time updates."""
         response = web.StreamResponse()
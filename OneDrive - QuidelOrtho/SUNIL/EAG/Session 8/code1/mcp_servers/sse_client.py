@@ -133,19 +133,52 @@ class SSEMCPClient:
             ) as response:
                 response.raise_for_status()
                 data = await response.json()
-                
-                # Extract result from MCP response format
-                if "content" in data and len(data["content"]) > 0:
-                    content_text = data["content"][0].get("text", "{}")
-                    return json.loads(content_text)
-                elif "error" in data:
-                    raise RuntimeError(data["error"])
-                else:
-                    return data
+                return self._parse_tool_response(data)
         except Exception as e:
             logger.error(f"Tool call failed ({tool_name}): {e}")
             raise
     
+    async def call_tools_batch(self, calls: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Call several tools on the MCP server in one HTTP round trip.
+        
+        Args:
+            calls: List of {"name": tool_name, "arguments": {...}} dicts
+            
+        Returns:
+            Tool results in request order; a failed call yields its exception
+        """
+        try:
+            await self._ensure_session()
+            async with self.session.post(
+                f"{self.server_url}/mcp/tools/batch",
+                json={"calls": calls}
+            ) as response:
+                response.raise_for_status()
+                data = await response.json()
+        except Exception as e:
+            logger.error(f"Batch tool call failed ({len(calls)} calls): {e}")
+            raise
+        
+        results = []
+        for item in data.get("results", []):
+            try:
+                results.append(self._parse_tool_response(item))
+            except Exception as e:
+                results.append(e)
+        return results
+    
+    @staticmethod
+    def _parse_tool_response(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract result from MCP response format."""
+        if "content" in data and len(data["content"]) > 0:
+            content_text = data["content"][0].get("text", "{}")
+            return json.loads(content_text)
+        elif "error" in data:
+            raise RuntimeError(data["error"])
+        else:
+            return data
+    
     async def close(self):
         """Close the client session."""
         if self.session and not self.session.closed:
@@ -205,6 +238,24 @@ class SSEMCPClientPool:
         client = await self.get_client(server_name)
         return await client.call_tool(tool_name, arguments)
     
+    async def call_tools_batch(
+        self,
+        server_name: str,
+        calls: List[Dict[str, Any]]
+    ) -> List[Any]:
+        """
+        Call several tools on a specific server in one round trip.
+        
+        Args:
+            server_name: Name of the server
+            calls: List of {"name": tool_name, "arguments": {...}} dicts
+            
+        Returns:
+            Tool results in request order; a failed call yields its exception
+        """
+        client = await self.get_client(server_name)
+        return await client.call_tools_batch(calls)
+    
     async def close_all(self):
         """Close all client connections."""
         for client in self.clients.values():